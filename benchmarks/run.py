@@ -0,0 +1,195 @@
+""" Benchmarks of integration, interpolation and spline kernels.
+
+Each case is measured with its best time of several repeats, peak memory of
+numpy allocations traced with tracemalloc and count of integrand evaluations.
+Results may be saved to JSON and compared with a stored baseline:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json --threshold 0.25
+
+Script exits with code 1 if time or memory of any case exceeds its baseline
+by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+
+# the script is run by path from the repository root, so the package isn't importable otherwise
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numerical  # noqa: E402
+from numerical import interpolate, splines  # noqa: E402
+from numerical.area.grid import UniformGrid  # noqa: E402
+from numerical.integration import gauss, sampled  # noqa: E402
+
+
+Case = namedtuple("Case", ["name", "setup"])
+Measure = namedtuple("Measure", ["time", "peak_memory", "evaluations"])
+
+
+class CountingFunction:
+    """ Integrand which counts points where it is evaluated. """
+    def __init__(self, ndfunc):
+        self.ndfunc = ndfunc
+        self.calls = 0
+        self.points = 0
+
+    def __call__(self, x):
+        self.calls += 1
+        self.points += x[0].size
+        return self.ndfunc(x)
+
+
+def polynomial(x):
+    return np.sum(np.power(x, 2), axis=0) + 1.
+
+
+def circle(x):
+    return np.power(x[0], 2) + 2 * x[1] + 5
+
+
+def integration_cases():
+    cases = []
+    for dim, steps in [(1, 0.001), (2, 0.02), (3, 0.1), (4, 0.5)]:
+        for roots_count in (4, 16):
+            def setup(dim=dim, steps=steps, roots_count=roots_count):
+                func = CountingFunction(polynomial)
+                return func, lambda: gauss.integrate(func, *(dim * [0., 1.]), steps=(steps,) * dim,
+                                                     roots_count=roots_count)
+            cases.append(Case(f"gauss.integrate dim={dim} roots_count={roots_count}", setup))
+
+    for batch_size in (8, 32, 128):
+        def setup(batch_size=batch_size):
+            func = CountingFunction(polynomial)
+            return func, lambda: gauss.integrate(func, 0., 1., 0., 1., steps=(0.005, 0.005), roots_count=8,
+                                                 batch_size=(batch_size, batch_size))
+        cases.append(Case(f"gauss.integrate dim=2 batch_size={batch_size}", setup))
+
+    for coords_type, bounds in [("cartesian", (-1., 1., -1., 1.)), ("polar", (0., 1., 0., 2 * np.pi))]:
+        def setup(coords_type=coords_type, bounds=bounds):
+            func = CountingFunction(circle)
+            return func, lambda: gauss.integrate(func, *bounds, steps=(0.01, 0.01), roots_count=8,
+                                                 coords_type=coords_type)
+        cases.append(Case(f"gauss.integrate coords_type={coords_type}", setup))
+
+    sampled_grid = UniformGrid((0., 1., 0., 1.), counts=(1001, 1001))
+    sampled_values = polynomial(np.array(sampled_grid.meshgrid(indexing="ij")))
+    for method in ("trapezoid", "simpson", "cubic"):
+        def setup(method=method):
+            return None, lambda: sampled.integrate(sampled_values, sampled_grid, method)
+        cases.append(Case(f"sampled.integrate nodes=1001x1001 method={method}", setup))
+    return cases
+
+
+def interpolation_cases():
+    cases = []
+    for dim, count in [(1, 10 ** 5), (2, 301), (3, 51)]:
+        meshgrid = np.meshgrid(*(dim * [np.linspace(0., 1., count)]), indexing="ij")
+        values = polynomial(np.array(meshgrid))
+        x = np.random.RandomState(0).rand(dim, 10 ** 5)
+        for kind in ("linear", "cubic"):
+            def build(meshgrid=meshgrid, values=values, kind=kind):
+                return None, lambda: interpolate(values, meshgrid, kind=kind)
+
+            def evaluate(meshgrid=meshgrid, values=values, kind=kind, x=x):
+                itp_fun = interpolate(values, meshgrid, kind=kind)
+                return None, lambda: itp_fun(x)
+            cases.append(Case(f"interpolate build dim={dim} kind={kind}", build))
+            cases.append(Case(f"interpolate evaluate dim={dim} kind={kind} points={x.shape[1]}", evaluate))
+    return cases
+
+
+def spline_cases():
+    x = np.random.RandomState(0).rand(10 ** 6) * 3.
+    cases = [Case("splines.schoenberg points=1e6", lambda: (None, lambda: splines.schoenberg(x)))]
+    for order in (1, 2):
+        cases.append(Case(f"splines.schoenberg.deriv order={order} points=1e6",
+                          lambda order=order: (None, lambda: splines.schoenberg.deriv(x, order))))
+    return cases
+
+
+def measure(case, repeat):
+    """ Best time of 'repeat' runs, peak memory and integrand evaluations of one run. """
+    times = []
+    for _ in range(repeat):
+        counter, run = case.setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    counter, run = case.setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measure(min(times), peak, counter.points if counter is not None else None)
+
+
+def compare(results, baseline, threshold):
+    """ Names and descriptions of cases which time or memory exceeds baseline by more than threshold. """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key in ("time", "peak_memory"):
+            base = baseline[name][key]
+            if base and result[key] > base * (1. + threshold):
+                regressions.append(f"{name}: {key} {result[key]:.6g} > {base:.6g} * (1 + {threshold})")
+        if baseline[name]["evaluations"] != result["evaluations"]:
+            regressions.append(f"{name}: evaluations {result['evaluations']} != {baseline[name]['evaluations']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="run only cases which names contain this substring")
+    parser.add_argument("--repeat", type=int, default=3, help="count of timed runs of each case")
+    parser.add_argument("--output", help="path of JSON file with results")
+    parser.add_argument("--baseline", help="path of JSON file with baseline results")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in integration_cases() + interpolation_cases() + spline_cases()
+             if args.filter in case.name]
+    results = {}
+    for case in cases:
+        result = measure(case, args.repeat)._asdict()
+        results[case.name] = result
+        evaluations = "" if result["evaluations"] is None else f"{result['evaluations']:>12d} evaluations"
+        print(f"{case.name:<60} {result['time'] * 1e3:10.2f} ms {result['peak_memory'] / 2 ** 20:10.2f} MiB "
+              f"{evaluations}")
+
+    if args.output:
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "numerical": numerical.__version__,
+                "machine": platform.machine(),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
-from numerical.interpolation import interpolate
+from numerical.interpolation import interpolate, interpolation_matrix, InterpolationMatrix
+from numerical.precision import get_dtype, set_dtype, precision
+from numerical.utils.stats import Stats
+from numerical.cache import ResultCache
 
 
 name = "numerical"
@@ -1,9 +1,23 @@
+import itertools
+
 import numpy as np
 from abc import ABCMeta, abstractmethod
 
 
 class _BaseGrid(metaclass=ABCMeta):
-    """ Base class for grid kinds. """
+    """ Base class for grid kinds.
+
+    One-dimensional grid is defined by its nodes. Values derived from nodes
+    are computed on demand and cached, so grid takes memory proportional
+    to count of nodes.
+    """
+    __slots__ = ("_nodes", "_sum", "_diff")
+
+    def __init__(self):
+        self._nodes = None
+        self._sum = None
+        self._diff = None
+
     @abstractmethod
     def _build_nodes(self):
         """ Builds grid on predefined boundary. """
@@ -12,6 +26,56 @@ class _BaseGrid(metaclass=ABCMeta):
     def __repr__(self):
         """ Defines str representation of grid object. """
 
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = self._build_nodes()
+            self._nodes.setflags(write=False)
+        return self._nodes
+
+    @property
+    def nodes_count(self):
+        return len(self.nodes)
+
+    @property
+    def sum(self):
+        """ Middles of grid cells as a column. """
+        if self._sum is None:
+            self._sum = ((self.nodes[1:] + self.nodes[:-1]) / 2.0).reshape(-1, 1)
+        return self._sum
+
+    @property
+    def diff(self):
+        """ Halves of grid cells sizes. """
+        if self._diff is None:
+            self._diff = (self.nodes[1:] - self.nodes[:-1]) / 2.0
+        return self._diff
+
+    @property
+    def bounds(self):
+        return self.nodes[0], self.nodes[-1]
+
+    def cell_index(self, x):
+        """ Indexes of cells which contain points, points outside the grid belong to boundary cells. """
+        cells = np.searchsorted(self.nodes, x, side="right") - 1
+        return np.clip(cells, 0, self.nodes_count - 2)
+
+    def locate(self, x):
+        """ Positions of points in node index coordinates.
+
+        Point in the cell [nodes[k], nodes[k + 1]] has position k + (x - nodes[k]) / (nodes[k + 1] - nodes[k]),
+        positions of points outside the grid are extrapolated by boundary cells.
+
+        Args:
+            x: numpy.ndarray, points.
+        Returns:
+            tuple of numpy.ndarray (positions, scales), where scales are derivatives of positions by points.
+        """
+        x = np.asarray(x)
+        cells = self.cell_index(x)
+        scales = 1. / (2. * self.diff[cells])
+        return cells + (x - self.nodes[cells]) * scales, scales
+
 
 class _UniformGrid(_BaseGrid):
     """ Class defines uniform grid object.
@@ -19,37 +83,152 @@ class _UniformGrid(_BaseGrid):
     'Uniform' means that distance between nearest nodes is the same
     for each node and defines as 'step'.
     """
-    def __init__(self, start, end, step):
-        self.start = start
-        self.end = end
-        self.step = step
-        self._build_nodes()
+    __slots__ = ("start", "end", "step", "count")
+
+    def __init__(self, start, end, step, count=None):
+        super().__init__()
+        self.start = float(start)
+        self.end = float(end)
+        self.step = float(step)
+        if count is None:
+            # count of nodes of np.arange(start, end, step) and the end node
+            count = max(int(np.ceil((self.end - self.start) / self.step)), 0) + 1
+        self.count = int(count)
 
     def _build_nodes(self):
-        self.nodes = np.arange(self.start, self.end, self.step)
-        self.nodes = np.append(self.nodes, self.end)
+        # the same nodes as np.arange(start, end, step), but count is kept exactly
+        nodes = self.start + np.arange(self.count - 1) * self.step
+        return np.append(nodes, self.end)
+
+    @property
+    def nodes_count(self):
+        return self.count
+
+    @property
+    def bounds(self):
+        return self.start, self.end
+
+    def cell_index(self, x):
+        """ Indexes of cells which contain points, points outside the grid belong to boundary cells. """
+        cells = np.nan_to_num(np.floor((np.asarray(x) - self.start) / self.step))
+        return np.clip(cells, 0, self.count - 2).astype(np.intp)
 
     def __repr__(self):
         return f"<{self.__class__.__name__}: " \
             f"start={self.start}, " \
             f"end={self.end}, " \
             f"step={self.step}, " \
-            f"nodes_count={len(self.nodes)}>"
+            f"nodes_count={self.count}>"
+
+
+class _RectilinearGrid(_BaseGrid):
+    """ Class defines one-dimensional grid with arbitrary increasing nodes. """
+    __slots__ = ("_source",)
+
+    def __init__(self, nodes):
+        super().__init__()
+        nodes = np.array(nodes, dtype=np.float64)
+        if nodes.ndim != 1 or len(nodes) < 2:
+            raise ValueError("Grid nodes must be 1-dimensional array with at least 2 nodes.")
+        if np.any(np.diff(nodes) <= 0):
+            raise ValueError("Grid nodes must be strictly increasing.")
+        self._source = nodes
+
+    def _build_nodes(self):
+        return self._source
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: " \
+            f"start={self.nodes[0]}, " \
+            f"end={self.nodes[-1]}, " \
+            f"nodes_count={self.nodes_count}>"
+
 
+class _BaseNDGrid:
+    """ Base class for n-dimensional grids which are products of one-dimensional grids. """
+    _grids = []
+    dim = 0
 
-class UniformGrid:
-    def __init__(self, bounds: tuple, steps: tuple):
+    @property
+    def shape(self):
+        """ Count of nodes along each axis. """
+        return tuple(g.nodes_count for g in self._grids)
+
+    @property
+    def mesh(self):
+        """ Coordinates of all grid nodes, built on each access. """
+        return self.meshgrid()
+
+    def meshgrid(self, indexing="xy", sparse=False):
+        """ Coordinates of all grid nodes, see numpy.meshgrid.
+
+        Sparse meshgrid takes memory proportional to count of nodes along axes.
+        """
+        return np.meshgrid(*[g.nodes for g in self._grids], indexing=indexing, sparse=sparse)
+
+    def iter_cells(self, batch_size: tuple):
+        """ Iterates over blocks of grid cells.
+
+        Args:
+            batch_size: tuple, max count of cells along each dimension in a block.
+        Yields:
+            tuple of slices of cells indexes for each dimension.
+        """
+        positions = [range(0, g.nodes_count - 1, size) for g, size in zip(self._grids, batch_size)]
+        for position in itertools.product(*positions):
+            yield tuple(slice(p, p + size) for p, size in zip(position, batch_size))
+
+    def iter_nodes(self, batch_size: tuple):
+        """ Iterates over blocks of grid nodes.
+
+        Args:
+            batch_size: tuple, max count of nodes along each dimension in a block.
+        Yields:
+            numpy.ndarray with shape (dim, nodes count 1, ..., nodes count n), coordinates of block nodes
+            with 'ij' indexing.
+        """
+        positions = [range(0, g.nodes_count, size) for g, size in zip(self._grids, batch_size)]
+        for position in itertools.product(*positions):
+            yield np.array(np.meshgrid(*[g.nodes[p:p + size] for g, p, size in zip(self._grids, position, batch_size)],
+                                       indexing="ij"))
+
+    def __iter__(self):
+        return iter(self._grids)
+
+    def __len__(self):
+        return self.dim
+
+    def __getitem__(self, item):
+        return self._grids[item]
+
+    def __repr__(self):
+        return "<[" + ", ".join([grd.__repr__() for grd in self._grids]) + "]>"
+
+
+class UniformGrid(_BaseNDGrid):
+    """ Uniform grid in n-dimensional box.
+
+    Grid stores only one-dimensional grids for each axis. Nodes of the whole grid
+    are built on demand with 'meshgrid' or block by block with 'iter_nodes'.
+    Grid may be defined by counts of nodes instead of steps, e.g. to describe
+    values stored in a file with their shape.
+    """
+    def __init__(self, bounds: tuple, steps: tuple = (), counts: tuple = None):
         try:
-            bounds = np.array(bounds).reshape(-1, 2)
+            bounds = np.array(bounds, dtype=np.float64).reshape(-1, 2)
         except ValueError:
-            raise ValueError("Number of bounds must be even. (2, 4 or 6).")
+            raise ValueError("Number of bounds must be even.")
 
-        if len(bounds) > 6:
-            raise ValueError(f"Max number of bounds is 6. {len(bounds)} > 6")
-
-        if not steps:
+        self._counts = None
+        if counts is not None:
+            counts = np.array(counts, dtype=np.intp).ravel()
+            if len(counts) != len(bounds) or np.any(counts < 2):
+                raise ValueError(f"Count of nodes must be at least 2 for each of {len(bounds)} axes.")
+            self._counts = counts
+            steps = np.diff(bounds, axis=1).ravel() / (counts - 1)
+        elif not steps:
             steps = (0.05,) * bounds.shape[0]
-        steps = np.array(steps).reshape(-1, 1)
+        steps = np.array(steps, dtype=np.float64).reshape(-1, 1)
 
         if len(bounds) != len(steps):
             raise ValueError(f"Boundary dimension and steps count don't match. {len(bounds)} != {len(steps)}")
@@ -60,9 +239,13 @@ class UniformGrid:
         self._build()
 
     def _build(self):
-        self._grids = [_UniformGrid(*bd, st) for bd, st in zip(self._bounds, self._steps)]
+        counts = self._counts if self._counts is not None else [None] * len(self._bounds)
+        self._grids = [_UniformGrid(*bd, *st, count) for bd, st, count in zip(self._bounds, self._steps, counts)]
         self.dim = len(self._grids)
-        self.mesh = np.meshgrid(*[g.nodes for g in self._grids])
+
+    @property
+    def bounds(self):
+        return self._bounds
 
     @property
     def steps(self):
@@ -70,22 +253,26 @@ class UniformGrid:
 
     @steps.setter
     def steps(self, value):
-        self._steps = value
+        steps = np.array(value, dtype=np.float64).reshape(-1, 1)
+        if len(steps) != self.dim:
+            raise ValueError(f"Boundary dimension and steps count don't match. {self.dim} != {len(steps)}")
+        self._steps = steps
+        self._counts = None
         self._build()
 
-    def __iter__(self):
-        self._grid_id = 0
-        return self
 
-    def __next__(self):
-        if self._grid_id == self.dim:
-            raise StopIteration
-        grid = self._grids[self._grid_id]
-        self._grid_id += 1
-        return grid
+class RectilinearGrid(_BaseNDGrid):
+    """ Grid in n-dimensional box with arbitrary nodes along each axis.
 
-    def __getitem__(self, item):
-        return self._grids[item]
+    Nodes may be clustered, e.g. near boundaries. Points are located in grid cells
+    with binary search in O(log n) time.
+    """
+    def __init__(self, *nodes):
+        if not nodes:
+            raise ValueError("Nodes must be specified for at least one axis.")
+        self._grids = [_RectilinearGrid(axis_nodes) for axis_nodes in nodes]
+        self.dim = len(self._grids)
 
-    def __repr__(self):
-        return "<[" + ", ".join([grd.__repr__() for grd in self._grids]) + "]>"
+    @property
+    def bounds(self):
+        return np.array([g.bounds for g in self._grids])
@@ -0,0 +1,215 @@
+""" Opt-in cache of integrals and interpolation coefficients.
+
+Results are addressed by a hash of everything they depend on: arrays contents,
+grid nodes, quadrature parameters and the integrand. Integrand is hashed by its
+name, bytecode, constants, values captured by closure and numbers, strings and arrays
+in global variables it reads, bound methods and callable objects also by attributes of
+their instances. Other global state, e.g. objects or modules attributes read by the
+integrand or functions it calls, isn't hashed, so such integrands must be given
+an explicit 'cache_key'.
+
+Cached arrays are read-only, since the same array is returned by each hit.
+
+Cache keeps results in memory with LRU eviction when their total size exceeds
+'max_bytes' and may store them in a directory, so other processes and later
+runs reuse them.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import types
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from numerical.coordinates import CoordinateTransform
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "disk_hits", "evictions", "entries", "bytes"])
+
+
+class ResultCache:
+    """ LRU cache of results with size-based eviction and optional disk store.
+
+    Args:
+        max_bytes: int, max total size of results kept in memory.
+        directory: str, directory where results are stored as pickle files, results are kept only
+            in memory if None.
+    """
+    def __init__(self, max_bytes: int = 2 ** 28, directory: str = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = self._misses = self._disk_hits = self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        """ Hex digest of parts: numpy arrays, grids, functions, coordinate transforms, numbers, strings
+        and their tuples. """
+        digest = hashlib.sha256()
+        _update(digest, parts, set())
+        return digest.hexdigest()
+
+    def get(self, key: str, default=None):
+        """ Result stored with key or default, the result becomes the most recently used. """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key][0]
+
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value):
+        """ Stores result with key in memory and on disk. """
+        self._remember(key, value)
+        if self.directory is not None:
+            # file is renamed after writing, so readers never see a partial file
+            handle, path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path, self._path(key))
+        return value
+
+    def invalidate(self, key: str = None):
+        """ Removes result with key from memory and disk, or all results if key is None. """
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for k in keys:
+                if k in self._entries:
+                    self._bytes -= self._entries.pop(k)[1]
+        if self.directory is not None:
+            names = os.listdir(self.directory) if key is None else [key + ".pkl"]
+            for name in names:
+                if name.endswith(".pkl") and os.path.exists(os.path.join(self.directory, name)):
+                    os.remove(os.path.join(self.directory, name))
+
+    def info(self):
+        """ Hits, misses, evictions, count and size of results in memory. """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._disk_hits, self._evictions, len(self._entries),
+                             self._bytes)
+
+    def _remember(self, key, value):
+        _read_only(value)
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def _load(self, key):
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        with open(self._path(key), "rb") as f:
+            return pickle.load(f)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.info()}>"
+
+
+def _read_only(value):
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, tuple):
+        for v in value:
+            _read_only(v)
+
+
+def _size(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+# arrays are hashed by chunks of rows, so non-contiguous arrays aren't copied at once
+_HASH_CHUNK_BYTES = 2 ** 24
+# types of global variables read by functions which are included into their hash
+_GLOBAL_TYPES = (bool, int, float, complex, str, bytes, np.generic, np.ndarray)
+
+
+def _update(digest, part, active):
+    """ Feeds canonical description of part into digest, 'active' are ids of functions being hashed. """
+    if isinstance(part, (tuple, list)):
+        digest.update(f"{type(part).__name__}:{len(part)}(".encode())
+        for item in part:
+            _update(digest, item, active)
+        digest.update(b")")
+    elif isinstance(part, np.ndarray):
+        digest.update(f"ndarray:{part.dtype.str}:{part.shape}:".encode())
+        rows = max(_HASH_CHUNK_BYTES // max(part[:1].nbytes, 1), 1) if part.ndim else 1
+        for position in range(0, len(part) if part.ndim else 1, rows):
+            chunk = part[position:position + rows] if part.ndim else part
+            digest.update(np.ascontiguousarray(chunk).tobytes())
+    elif part is None or isinstance(part, (bool, int, float, complex, str, bytes, np.generic, np.dtype)):
+        digest.update(f"{type(part).__name__}:{part!r};".encode())
+    elif hasattr(part, "_grids"):
+        # n-dimensional grids are defined by nodes along each axis
+        _update(digest, (type(part).__name__, [axis.nodes for axis in part]), active)
+    elif isinstance(part, functools.partial):
+        _update(digest, ("partial", part.func, part.args, sorted(part.keywords.items())), active)
+    elif isinstance(part, CoordinateTransform):
+        _update(digest, (type(part).__qualname__, sorted(vars(part).items())), active)
+    elif hasattr(part, "__self__") and hasattr(part, "__func__"):
+        # bound method depends on its instance, while its '__code__' is the code of the class function
+        _update(digest, ("method", part.__self__, part.__func__), active)
+    elif hasattr(part, "__code__"):
+        code = part.__code__
+        if id(code) in active:
+            # recursive function refers to itself in closure
+            digest.update(f"function:{part.__qualname__};".encode())
+            return
+        active.add(id(code))
+        closure = [cell.cell_contents for cell in part.__closure__ or ()]
+        # values of global variables change results without changing code
+        global_values = [(name, part.__globals__[name]) for name in code.co_names
+                         if isinstance(part.__globals__.get(name), _GLOBAL_TYPES)]
+        _update(digest, ("function", part.__module__, part.__qualname__, code.co_code,
+                         [c.co_code if hasattr(c, "co_code") else c for c in code.co_consts], code.co_names,
+                         part.__defaults__ or (), closure, global_values), active)
+        active.discard(id(code))
+    elif hasattr(part, "__dict__") and not isinstance(part, (type, types.ModuleType)):
+        # objects, e.g. callable ones, are hashed by class, its '__call__' and instance attributes
+        cls = type(part)
+        if id(part) in active:
+            digest.update(f"object:{cls.__module__}.{cls.__qualname__};".encode())
+            return
+        active.add(id(part))
+        call = getattr(cls, "__call__", None)
+        _update(digest, ("object", cls.__module__, cls.__qualname__, call if hasattr(call, "__code__") else None,
+                         sorted(vars(part).items())), active)
+        active.discard(id(part))
+    elif type(part).__repr__ is object.__repr__:
+        # default repr contains memory address, which is reused by other objects
+        raise ValueError(f"{type(part).__qualname__} object can't be hashed by its contents. "
+                         f"Please give 'cache_key'.")
+    else:
+        digest.update(f"{type(part).__module__}.{type(part).__qualname__}:{part!r};".encode())
@@ -0,0 +1,205 @@
+""" Curvilinear coordinates of integration.
+
+Integral of f over an area in curvilinear coordinates u is the integral of
+f(cartesian(u)) * J(u), where J is the Jacobian determinant of the transform.
+
+Polar, cylindrical and spherical coordinates are separable: each cartesian
+coordinate and the Jacobian are products of functions of single coordinates.
+On tensor grids of Gauss integration these functions (e.g. sin and cos of angles)
+are computed once per axis for a block of cells and broadcast over the tensor,
+the Jacobian is multiplied into function values in place.
+
+Coordinates:
+    polar (r, phi): x = r cos(phi), y = r sin(phi).
+    cylindrical (r, phi, z): x = r cos(phi), y = r sin(phi), z = z.
+    spherical (r, theta, phi), theta is the polar angle from z axis in [0, pi]:
+        x = r sin(theta) cos(phi), y = r sin(theta) sin(phi), z = r cos(theta).
+"""
+import functools
+
+import numpy as np
+
+from numerical.utils.integration import tensor_args
+
+
+class CoordinateTransform:
+    """ Transform of curvilinear coordinates given by user functions of points.
+
+    Functions must be picklable (e.g. defined at module level) to integrate in other processes.
+
+    Args:
+        to_cartesian: function which takes numpy.ndarray with shape (n, ...) of curvilinear coordinates
+            and returns cartesian coordinates with shape (m, ...).
+        jacobian: function which takes the same points and returns the Jacobian determinant with shape (...).
+    """
+    dim = None
+
+    def __init__(self, to_cartesian, jacobian):
+        self._to_cartesian = to_cartesian
+        self._jacobian = jacobian
+
+    def to_cartesian(self, x):
+        return self._to_cartesian(x)
+
+    def jacobian(self, x):
+        return self._jacobian(x)
+
+    def tensor_cartesian(self, axis_args):
+        """ Cartesian coordinates on cartesian product of cells and roots.
+
+        Args:
+            axis_args: list of numpy.ndarray with shape (cells count, roots count), curvilinear coordinates
+                for each dimension.
+        Returns:
+            numpy.ndarray with shape (m, cells count 1, ..., cells count n, roots count 1, ..., roots count n).
+        """
+        return self.to_cartesian(tensor_args(axis_args))
+
+    def tensor_jacobian(self, f_val, axis_args):
+        """ Function values on cartesian product of cells and roots multiplied by the Jacobian. """
+        return f_val * self.jacobian(tensor_args(axis_args))
+
+    def __call__(self, ndfunc, x):
+        """ Function values multiplied by the Jacobian at points in curvilinear coordinates. """
+        f_val = np.asarray(ndfunc(self.to_cartesian(x)))
+        return f_val * self.jacobian(x)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: to_cartesian={self._to_cartesian}, jacobian={self._jacobian}>"
+
+
+class SeparableTransform(CoordinateTransform):
+    """ Transform where cartesian coordinates and the Jacobian are products of functions of single coordinates.
+
+    Args:
+        dim: int, count of curvilinear coordinates.
+        coordinates: list of factors for each cartesian coordinate, where factor is a tuple
+            (coordinate index, function of this coordinate).
+        jacobian: list of factors of the Jacobian determinant.
+        name: str, name of coordinates.
+    """
+    def __init__(self, dim, coordinates, jacobian, name=None):
+        super().__init__(None, None)
+        self.dim = dim
+        self.coordinates = tuple(tuple(factors) for factors in coordinates)
+        self.jacobian_factors = tuple(jacobian)
+        self.name = name
+
+    def to_cartesian(self, x):
+        return np.array([_product(x, factors) for factors in self.coordinates])
+
+    def jacobian(self, x):
+        return _product(x, self.jacobian_factors)
+
+    def tensor_cartesian(self, axis_args):
+        tables = _AxisTables(axis_args)
+        args = np.empty((len(self.coordinates),) + tables.shape, dtype=np.result_type(*axis_args))
+        for arg, factors in zip(args, self.coordinates):
+            # the first factor is assigned and the others are multiplied in place with broadcasting
+            arg[...] = tables[factors[0]]
+            for factor in factors[1:]:
+                arg *= tables[factor]
+        return args
+
+    def tensor_jacobian(self, f_val, axis_args):
+        if not self.jacobian_factors:
+            return f_val
+        tables = _AxisTables(axis_args)
+        # function values may be shared with caller, so only the first product allocates
+        f_val = f_val * tables[self.jacobian_factors[0]]
+        for factor in self.jacobian_factors[1:]:
+            f_val *= tables[factor]
+        return f_val
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: name={self.name}, dim={self.dim}>"
+
+
+def _identity(x):
+    return x
+
+
+POLAR = SeparableTransform(
+    2,
+    [[(0, _identity), (1, np.cos)],
+     [(0, _identity), (1, np.sin)]],
+    [(0, _identity)],
+    name="polar",
+)
+
+CYLINDRICAL = SeparableTransform(
+    3,
+    [[(0, _identity), (1, np.cos)],
+     [(0, _identity), (1, np.sin)],
+     [(2, _identity)]],
+    [(0, _identity)],
+    name="cylindrical",
+)
+
+SPHERICAL = SeparableTransform(
+    3,
+    [[(0, _identity), (1, np.sin), (2, np.cos)],
+     [(0, _identity), (1, np.sin), (2, np.sin)],
+     [(0, _identity), (1, np.cos)]],
+    [(0, np.square), (1, np.sin)],
+    name="spherical",
+)
+
+TRANSFORMS = {
+    "polar": POLAR,
+    "cylindrical": CYLINDRICAL,
+    "spherical": SPHERICAL,
+}
+
+
+def get_transform(coords_type):
+    """ Transform of coordinates type, None for cartesian coordinates.
+
+    Args:
+        coords_type: str, 'cartesian', 'polar', 'cylindrical', 'spherical' or CoordinateTransform object.
+    Returns:
+        CoordinateTransform or None.
+    """
+    if isinstance(coords_type, CoordinateTransform):
+        return coords_type
+    if coords_type == "cartesian":
+        return None
+    if coords_type in TRANSFORMS:
+        return TRANSFORMS[coords_type]
+    raise ValueError("Coordinates type can be 'cartesian', 'polar', 'cylindrical', 'spherical' "
+                     "or CoordinateTransform object.")
+
+
+def coordinate_transform(ndfunc, coords_type):
+    """ Function of curvilinear coordinates which values are multiplied by the Jacobian. """
+    transform = get_transform(coords_type)
+    if transform is None:
+        return ndfunc
+    # partial object is picklable unlike closure, so transformed function may be sent to other processes
+    return functools.partial(transform, ndfunc)
+
+
+class _AxisTables:
+    """ Values of functions of single coordinates computed once per axis and shaped for broadcasting. """
+    def __init__(self, axis_args):
+        self.axis_args = axis_args
+        self.dim = len(axis_args)
+        self.shape = tuple(arg.shape[0] for arg in axis_args) + tuple(arg.shape[1] for arg in axis_args)
+        self._tables = {}
+
+    def __getitem__(self, factor):
+        if factor not in self._tables:
+            axis, func = factor
+            arg = self.axis_args[axis]
+            arg_shape = [1] * (2 * self.dim)
+            arg_shape[axis], arg_shape[self.dim + axis] = arg.shape
+            self._tables[factor] = func(arg).reshape(arg_shape)
+        return self._tables[factor]
+
+
+def _product(x, factors):
+    """ Product of functions of single coordinates at points. """
+    result = np.ones(x.shape[1:], dtype=x.dtype)
+    for axis, func in factors:
+        result = result * func(x[axis])
+    return result
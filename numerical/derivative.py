@@ -1,4 +1,5 @@
-from numerical.splines.derivatives import schoenberg_spline_derivatives
+from numerical.splines.derivatives import spline_derivatives
+from numerical.splines.piecewise import PiecewisePolynomial
 
 
 class setup:
@@ -8,10 +9,12 @@ class setup:
 
     def __call__(self, f):
         if self.ftype == "numerical":
-            if f.__name__ == "schoenberg":
-                f = schoenberg_spline_derivatives(f)
+            if isinstance(getattr(f, "kernel", None), PiecewisePolynomial):
+                max_order = self.max_order[0] if isinstance(self.max_order, tuple) else self.max_order
+                f = spline_derivatives(f, max_order)
             else:
-                raise NotImplementedError
+                raise NotImplementedError(f"Numerical derivatives are implemented only for piecewise polynomial "
+                                          f"splines. Function '{f.__name__}' doesn't have such kernel.")
         elif self.ftype == "symbolical":
             raise NotImplementedError
         else:
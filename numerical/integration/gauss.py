@@ -1,87 +1,645 @@
+import asyncio
+import functools
+import inspect
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
 import numpy as np
-from numpy.polynomial.legendre import leggauss
-from numerical.utils.linalg import multi_dot2
-from numerical.utils.integration import repeat_args, coordinate_transform
+from numerical.coordinates import get_transform, coordinate_transform
+from numerical.integration.rules import leggauss_rule
+from numerical.precision import DEFAULT_MEMORY_LIMIT, MAX_BATCH_POINTS, get_dtype, precision, resolve_dtype, cast
+from numerical.utils.linalg import contract
+from numerical.utils.stats import BatchStats
+from numerical.utils.summation import CompensatedSum
+from numerical.utils.integration import tensor_args, cells_args, broadcast_values, stack_functions
 from numerical.area import grid
 
 
+_EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+PartialIntegral = namedtuple("PartialIntegral", ["integral", "blocks_done", "blocks_count", "batch_size"])
+AdaptiveResult = namedtuple("AdaptiveResult", ["integral", "error", "evaluations"])
+
+
 def integrate(ndfunc: "numpy function",
               *bounds: "integration limits",
               steps: tuple = (),
               coords_type="cartesian",
               ndgrid: grid.UniformGrid = None,
               roots_count: int = 32,
-              batch_size: tuple = None):
+              batch_size: tuple = None,
+              executor=None,
+              workers: int = None,
+              dtype=None,
+              stats=None,
+              memory_limit: int = None,
+              probe: bool = False,
+              cache=None,
+              cache_key=None):
     """ Integrate a function numerically using Gauss formula
 
+    Function may be vector-valued: if for argument with shape (n, ...) it returns values with
+    shape (k1, ..., km, ...), integral is numpy.ndarray with shape (k1, ..., km).
+
     Args:
-        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables 1<= n <=3.
+        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables.
         bounds: tuple of floats which indicate integration limits
         steps: tuple of floats which indicates integration steps
-        coords_type: str, type of coordinates for integration ('cartesian', 'polar', 'spherical')
+        coords_type: str, type of coordinates for integration ('cartesian', 'polar', 'cylindrical',
+            'spherical') or numerical.coordinates.CoordinateTransform object.
         ndgrid: area.grid.Grid object which contains grid data for numerical integration.
         roots_count: count of zero roots in Legendre polynomial.
-        batch_size: tuple, batch size for integration process
+        batch_size: tuple, max count of grid cells along each dimension evaluated at once, or 'auto'
+            for the largest batch which arrays fit into 'memory_limit', see 'plan_batch_size'.
+        executor: 'thread', 'process' or concurrent.futures.Executor object which evaluates blocks of grid cells
+            in parallel. 'thread' suits functions which release GIL (numpy operations), 'process' suits
+            pure python functions, which must be picklable in this case. Blocks are evaluated serially if
+            both 'executor' and 'workers' are None.
+        workers: int, count of workers in created pool.
+        dtype: floating data type of function arguments and quadrature weights, the default one if None.
+            Integrals of cells are accumulated in float64 regardless of it.
+        stats: callable, e.g. numerical.Stats object, which is called with BatchStats
+            of each block with times of arguments building, function evaluation and reduction,
+            and batch size chosen for blocks, e.g. planned for 'memory_limit'.
+        memory_limit: int, bytes of arrays of a block of cells, batch size is automatic if it is given.
+            Automatic batch size takes count of function values from its evaluation at a single point.
+        probe: bool, if True automatic batch size is calibrated for throughput: a block of the largest
+            batch and of a few smaller ones is evaluated once and the fastest one per point is used.
+            Evaluations of probe blocks aren't included into integral.
+        cache: numerical.cache.ResultCache object, integral is computed only if cache doesn't contain
+            integral of the same function on the same grid with the same quadrature.
+        cache_key: hashable description of function used in cache key instead of function itself,
+            e.g. if function depends on global state.
 
     Returns:
         numpy.ndarray values of function integral in grid area.
     """
+    key = None
+    if cache is not None:
+        area = grid.UniformGrid(bounds, steps) if bounds else ndgrid
+        key = cache.key("gauss.integrate", ndfunc if cache_key is None else cache_key, area, roots_count,
+                        coords_type, resolve_dtype(dtype).str)
+        integral = cache.get(key)
+        if integral is not None:
+            return integral
+
+    partial = None
+    for partial in integrate_iter(ndfunc, *bounds, steps=steps, coords_type=coords_type, ndgrid=ndgrid,
+                                  roots_count=roots_count, batch_size=batch_size, executor=executor,
+                                  workers=workers, dtype=dtype, stats=stats, memory_limit=memory_limit,
+                                  probe=probe):
+        pass
+    if cache is not None:
+        cache.put(key, partial.integral)
+    return partial.integral
+
+
+def integrate_many(ndfuncs: "list of numpy functions", *bounds: "integration limits", **kwargs):
+    """ Integrate several functions numerically using Gauss formula in one pass.
+
+    All functions are evaluated on the same quadrature points, so grid and quadrature
+    layout are built only once. A family of functions f(x, p) for parameters p may be
+    integrated faster as a single vector-valued function (see 'integrate').
+
+    Args:
+        ndfuncs: list of functions which take numpy.ndarray where the first shape equal to n,
+            where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        kwargs: integration parameters, see 'integrate'.
+
+    Returns:
+        numpy.ndarray values of functions integrals in grid area.
+    """
+    return integrate(stack_functions(ndfuncs), *bounds, **kwargs)
+
+
+def integrate_iter(ndfunc: "numpy function",
+                   *bounds: "integration limits",
+                   steps: tuple = (),
+                   coords_type="cartesian",
+                   ndgrid: grid.UniformGrid = None,
+                   roots_count: int = 32,
+                   batch_size: tuple = None,
+                   executor=None,
+                   workers: int = None,
+                   dtype=None,
+                   stats=None,
+                   memory_limit: int = None,
+                   probe: bool = False):
+    """ Integrate a function numerically using Gauss formula block by block.
+
+    Integrals of blocks of grid cells are accumulated with compensated summation right after
+    their evaluation, so memory doesn't depend on grid size and partial results are available
+    while integration is in progress.
+
+    Args:
+        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        steps: tuple of floats which indicates integration steps
+        coords_type: str, type of coordinates for integration ('cartesian', 'polar', 'cylindrical',
+            'spherical') or numerical.coordinates.CoordinateTransform object.
+        ndgrid: area.grid.Grid object which contains grid data for numerical integration.
+        roots_count: count of zero roots in Legendre polynomial.
+        batch_size: tuple, max count of grid cells along each dimension evaluated at once, or 'auto'.
+        executor: 'thread', 'process' or concurrent.futures.Executor object, see 'integrate'.
+        workers: int, count of workers in created pool.
+        dtype: floating data type of function arguments and quadrature weights, the default one if None.
+        stats: callable which is called with BatchStats of each block, see 'integrate'.
+        memory_limit: int, bytes of arrays of a block of cells, batch size is automatic if it is given.
+            Automatic batch size takes count of function values from its evaluation at a single point.
+        probe: bool, calibrate automatic batch size for throughput, see 'integrate'.
+
+    Yields:
+        PartialIntegral with integral over evaluated blocks, count of evaluated blocks, count of all blocks
+        and batch size of blocks.
+    """
 
     if bounds:
         ndgrid = grid.UniformGrid(bounds, steps)
+    transform, leg_roots, leg_weights, dtype = _quadrature(ndgrid, coords_type, roots_count, dtype)
 
-    if batch_size is None:
-        batch_size = (32,) * ndgrid.dim
+    auto = _is_auto(batch_size, memory_limit)
+    values_size = _values_size(ndfunc(_point_arguments(ndgrid, leg_roots, transform, dtype))) if auto else 1
+    batch_size = _planned_batch_size(ndgrid, roots_count, batch_size, memory_limit, dtype, values_size)
+    if auto and probe:
+        batch_size = _probe_batch_size(functools.partial(_integrate_block, ndfunc, leg_weights, transform),
+                                       ndgrid, leg_roots, roots_count, batch_size, dtype)
+
+    blocks_count = int(np.prod([np.ceil((g.nodes_count - 1) / size) for g, size in zip(ndgrid, batch_size)]))
+    blocks = _integration_blocks(ndgrid, leg_roots, batch_size, dtype)
+    blocks_values = _map_blocks(functools.partial(_integrate_block, ndfunc, leg_weights, transform,
+                                                  timed=stats is not None, batch_size=batch_size),
+                                blocks, executor, workers)
+    # blocks don't depend on workers count and are summed in the same order, so result is reproducible
+    result = CompensatedSum()
+    for blocks_done, block_value in enumerate(blocks_values, 1):
+        if stats is not None:
+            # statistics are measured by workers and reported in blocks order
+            block_value, block_stats = block_value
+            stats(block_stats)
+        result.add(block_value)
+        yield PartialIntegral(cast(result.value, dtype)[()], blocks_done, blocks_count, batch_size)
+
+
+def integrate_cells(ndfunc: "numpy function",
+                    *bounds: "integration limits",
+                    steps: tuple = (),
+                    coords_type="cartesian",
+                    ndgrid: grid.UniformGrid = None,
+                    roots_count: int = 32,
+                    batch_size: tuple = None,
+                    executor=None,
+                    workers: int = None,
+                    dtype=None,
+                    stats=None,
+                    memory_limit: int = None):
+    """ Integrals of a function over each grid cell using Gauss formula.
+
+    Integrals over many sub-boxes of the grid area are sums of cells integrals, which are
+    answered in constant time with numerical.integration.summed_area.SummedAreaTable.
+
+    Args:
+        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        steps: tuple of floats which indicates integration steps
+        coords_type: str, type of coordinates for integration, see 'integrate'.
+        ndgrid: area.grid.Grid object which contains grid data for numerical integration.
+        roots_count: count of zero roots in Legendre polynomial.
+        batch_size: tuple, max count of grid cells along each dimension evaluated at once, or 'auto'.
+        executor: 'thread', 'process' or concurrent.futures.Executor object, see 'integrate'.
+        workers: int, count of workers in created pool.
+        dtype: floating data type of function arguments, quadrature weights and result, the default one if None.
+        stats: callable which is called with BatchStats of each block, see 'integrate'.
+        memory_limit: int, bytes of arrays of a block of cells, batch size is automatic if it is given.
+            Automatic batch size takes count of function values from its evaluation at a single point.
+
+    Returns:
+        numpy.ndarray with shape (function values shape) + (cells count 1, ..., cells count n),
+        integrals of grid cells with 'ij' indexing.
+    """
+    if bounds:
+        ndgrid = grid.UniformGrid(bounds, steps)
+    transform, leg_roots, leg_weights, dtype = _quadrature(ndgrid, coords_type, roots_count, dtype)
+    values_size = 1
+    if _is_auto(batch_size, memory_limit):
+        values_size = _values_size(ndfunc(_point_arguments(ndgrid, leg_roots, transform, dtype)))
+    batch_size = _planned_batch_size(ndgrid, roots_count, batch_size, memory_limit, dtype, values_size)
+
+    blocks = _integration_blocks(ndgrid, leg_roots, batch_size, dtype)
+    blocks_values = _map_blocks(functools.partial(_integrate_block, ndfunc, leg_weights, transform,
+                                                  timed=stats is not None, cellwise=True, batch_size=batch_size),
+                                blocks, executor, workers)
+    cells_shape = tuple(g.nodes_count - 1 for g in ndgrid)
+    result = None
+    for cells, block_value in zip(ndgrid.iter_cells(batch_size), blocks_values):
+        if stats is not None:
+            block_value, block_stats = block_value
+            stats(block_stats)
+        if result is None:
+            values_shape = block_value.shape[:block_value.ndim - ndgrid.dim]
+            result = np.empty(values_shape + cells_shape, dtype=cast(block_value[:0], dtype).dtype)
+        result[(Ellipsis,) + cells] = block_value
+    return result
+
+
+async def integrate_async(ndfunc: "coroutine function",
+                          *bounds: "integration limits",
+                          steps: tuple = (),
+                          coords_type="cartesian",
+                          ndgrid: grid.UniformGrid = None,
+                          roots_count: int = 32,
+                          batch_size: tuple = None,
+                          concurrency: int = 4,
+                          dtype=None,
+                          stats=None,
+                          memory_limit: int = None):
+    """ Integrate a coroutine function numerically using Gauss formula.
+
+    Suits latency-bound functions, e.g. which send points to a server: up to 'concurrency' blocks
+    of grid cells are awaited at once in the event loop. Next block is started only when the oldest
+    one is done, so memory is bounded, and integrals of blocks are summed in blocks order, so result
+    doesn't depend on completion order. Function may also return values synchronously.
+
+    Args:
+        ndfunc: coroutine function which takes numpy.ndarray where the first shape equal to n,
+            where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        steps: tuple of floats which indicates integration steps
+        coords_type: str, type of coordinates for integration, see 'integrate'.
+        ndgrid: area.grid.Grid object which contains grid data for numerical integration.
+        roots_count: count of zero roots in Legendre polynomial.
+        batch_size: tuple, max count of grid cells along each dimension evaluated at once, or 'auto'.
+        concurrency: int, max count of blocks awaited at once.
+        dtype: floating data type of function arguments and quadrature weights, the default one if None.
+        stats: callable which is called with BatchStats of each block in blocks order, see 'integrate'.
+            Function time of block includes its waiting in the event loop.
+        memory_limit: int, bytes of arrays of a block of cells, batch size is automatic if it is given.
+            Automatic batch size takes count of function values from its evaluation at a single point.
+
+    Returns:
+        numpy.ndarray value of function integral in grid area.
+    """
+    if concurrency < 1:
+        raise ValueError("Concurrency must be a positive int.")
+    if bounds:
+        ndgrid = grid.UniformGrid(bounds, steps)
+    transform, leg_roots, leg_weights, dtype = _quadrature(ndgrid, coords_type, roots_count, dtype)
+    values_size = 1
+    if _is_auto(batch_size, memory_limit):
+        point_values = ndfunc(_point_arguments(ndgrid, leg_roots, transform, dtype))
+        if inspect.isawaitable(point_values):
+            point_values = await point_values
+        values_size = _values_size(point_values)
+    batch_size = _planned_batch_size(ndgrid, roots_count, batch_size, memory_limit, dtype, values_size)
+
+    result = CompensatedSum()
+    pending = deque()
+
+    async def add_oldest():
+        block_value = await pending.popleft()
+        if stats is not None:
+            block_value, block_stats = block_value
+            stats(block_stats)
+        result.add(block_value)
+
+    try:
+        for block in _integration_blocks(ndgrid, leg_roots, batch_size, dtype):
+            if len(pending) >= concurrency:
+                await add_oldest()
+            pending.append(asyncio.ensure_future(
+                _integrate_block_async(ndfunc, leg_weights, transform, block, timed=stats is not None,
+                                       batch_size=batch_size)))
+        while pending:
+            await add_oldest()
+    finally:
+        # blocks in flight are cancelled if function fails or integration is cancelled
+        for task in pending:
+            task.cancel()
+    return cast(result.value, dtype)[()]
+
+
+def integrate_adaptive(ndfunc: "numpy function",
+                       *bounds: "integration limits",
+                       steps: tuple = (),
+                       coords_type="cartesian",
+                       ndgrid: grid.UniformGrid = None,
+                       roots_count: int = 8,
+                       atol: float = 1e-8,
+                       rtol: float = 1e-8,
+                       max_evaluations: int = 10 ** 7,
+                       dtype=None):
+    """ Integrate a function numerically using Gauss formula with adaptive refinement of grid cells.
+
+    Integral of each cell is computed with 'roots_count' and 'roots_count // 2' roots,
+    difference of these values is an error estimate of the cell. Cells which error exceeds
+    their share of tolerance (proportional to cell volume) are split in halves along each
+    dimension until the tolerance or 'max_evaluations' is reached. Error of a cell of
+    vector-valued function is the max error of its components.
+
+    Args:
+        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        steps: tuple of floats which indicates initial integration steps, the whole area is an initial cell if empty.
+        coords_type: str, type of coordinates for integration ('cartesian', 'polar', 'cylindrical',
+            'spherical') or numerical.coordinates.CoordinateTransform object.
+        ndgrid: area.grid.Grid object which contains initial grid for numerical integration.
+        roots_count: count of zero roots in Legendre polynomial, at least 2.
+        atol: float, absolute tolerance of integral.
+        rtol: float, relative tolerance of integral.
+        max_evaluations: int, max count of function evaluations, it must be enough for initial cells.
+        dtype: floating data type of function arguments and quadrature weights, the default one if None.
+
+    Returns:
+        AdaptiveResult with integral value, its error estimate and count of function evaluations.
+    """
+    if roots_count < 2:
+        raise ValueError("Adaptive integration needs at least 2 roots to estimate error of cells.")
+    if bounds:
+        if not steps:
+            steps = tuple(np.diff(np.reshape(bounds, (-1, 2)), axis=1).ravel())
+        ndgrid = grid.UniformGrid(bounds, steps)
+    _check_cells(ndgrid)
 
     ndfunc = coordinate_transform(ndfunc, coords_type)
-    _build_integration_meta(ndgrid)
+    dtype = resolve_dtype(dtype)
+    dim = ndgrid.dim
+    low_roots_count = roots_count // 2
+    cell_evaluations = roots_count ** dim + low_roots_count ** dim
 
-    leg_roots, leg_weights = leggauss(roots_count)
-    leg_roots = leg_roots.reshape(1, -1)
+    # initial cells are grid cells
+    lower = np.stack(np.meshgrid(*[g.nodes[:-1] for g in ndgrid], indexing="ij"), -1).reshape(-1, dim)
+    upper = np.stack(np.meshgrid(*[g.nodes[1:] for g in ndgrid], indexing="ij"), -1).reshape(-1, dim)
+    volume = np.sum(np.prod(upper - lower, axis=1))
+    if len(lower) * cell_evaluations > max_evaluations:
+        raise ValueError(f"Initial {len(lower)} cells need {len(lower) * cell_evaluations} evaluations, "
+                         f"which exceeds max_evaluations {max_evaluations}. Please use a coarser grid.")
+    # lower corners of children cells in units of parent cell half size
+    children_shifts = np.stack(np.meshgrid(*(dim * [[0., 1.]]), indexing="ij"), -1).reshape(-1, dim)
+
+    integral, error, evaluations = 0., 0., 0
+    while len(lower):
+        centers, halves = (upper + lower) / 2., (upper - lower) / 2.
+        high = _cells_quadrature(ndfunc, centers, halves, roots_count, dtype)
+        low = _cells_quadrature(ndfunc, centers, halves, low_roots_count, dtype)
+        evaluations += len(lower) * cell_evaluations
+        # cells are the last axis of integrals, leading axes are components of function values
+        components_error = np.abs(high - low)
+        cells_error = np.max(components_error.reshape(-1, len(lower)), axis=0)
+
+        tolerance = max(atol, rtol * np.max(np.abs(integral + np.sum(high, axis=-1))))
+        accepted = cells_error <= tolerance * np.prod(2. * halves, axis=1) / volume
+        if evaluations + 2 ** dim * np.count_nonzero(~accepted) * cell_evaluations > max_evaluations:
+            accepted[:] = True
+
+        integral += np.sum(high[..., accepted], axis=-1)
+        error += np.sum(components_error[..., accepted], axis=-1)
+        # rejected cells are split into 2^dim children
+        lower, halves = lower[~accepted], halves[~accepted]
+        lower = (np.expand_dims(lower, 1) + np.expand_dims(halves, 1) * children_shifts).reshape(-1, dim)
+        upper = lower + np.repeat(halves, len(children_shifts), axis=0)
+
+    return AdaptiveResult(cast(integral, dtype)[()], cast(error, dtype)[()], evaluations)
+
+
+def _cells_quadrature(ndfunc, centers, halves, roots_count, dtype):
+    """ Integrates function on each cell given by its centers and halves of sizes.
+
+    Returns:
+        numpy.ndarray with shape (function values shape) + (cells count,).
+    """
+    dim = centers.shape[1]
+    leg_roots, _ = leggauss_rule(roots_count, np.float64)
+    _, leg_weights = leggauss_rule(roots_count, dtype)
 
     result = []
-    # positions of batch step for each dimension
-    batch_position = [0] * ndgrid.dim
-    # pairwise product of legendre weights for function evaluation
-    nd_leg_weights = multi_dot2(*(ndgrid.dim * [leg_weights]), flatten=True, reshape=True)
-    # pairwise product of grid steps diff for the left function multiplication
-    nd_outer_diff = multi_dot2(*[gd.diff for gd in ndgrid], flatten=True)
-    # batch integration recursive loop with output in 'results'
-    _integration_loop(result, ndfunc, ndgrid, nd_leg_weights, leg_roots, roots_count, batch_position, batch_size)
-    result = np.concatenate(result)
-    return np.dot(nd_outer_diff, result)[0]
-
-
-def _integration_loop(result_list, ndfunc, ndgrid, nd_leg_weights, leg_roots, roots_count,
-                      batch_position, batch_size, nest_id=-1):
-    if nest_id == ndgrid.dim - 1:
+    batch = max(MAX_BATCH_POINTS // roots_count ** dim, 1)
+    for position in range(0, len(centers), batch):
+        batch_centers = centers[position:position + batch]
+        batch_halves = halves[position:position + batch]
+        batch_args = [(batch_centers[:, [i]] + batch_halves[:, [i]] * leg_roots).astype(dtype) for i in range(dim)]
+
+        f_args = cells_args(batch_args)
+        f_val = broadcast_values(ndfunc(f_args), f_args.shape[1:])
+        # roots axes are contracted with legendre weights axis by axis
+        fw_mul = contract(f_val, *dim * [leg_weights])
+        result.append(fw_mul.astype(np.result_type(fw_mul, np.float64)) * np.prod(batch_halves, axis=1))
+    return np.concatenate(result, axis=-1)
+
+
+def _integration_blocks(ndgrid, leg_roots, batch_size, dtype=np.float64):
+    """ Splits grid into independent blocks of cells.
+
+    Function arguments are computed in float64 and rounded to 'dtype', grid steps stay in float64.
+
+    Yields:
+        tuple (batch_args, batch_diffs), function arguments and grid steps of block cells for each dimension.
+    """
+    for cells in ndgrid.iter_cells(batch_size):
         batch_args = []
-        cnt_reps = []
+        batch_diffs = []
         for dim in range(ndgrid.dim):
-            dim_batch_position = batch_position[dim]
-            sum_batch = ndgrid[dim].sum[dim_batch_position:dim_batch_position + batch_size[dim]]
-            diff_t_batch = ndgrid[dim].diff_t[dim_batch_position:dim_batch_position + batch_size[dim]]
+            sum_batch = ndgrid[dim].sum[cells[dim]]
+            diff_batch = ndgrid[dim].diff[cells[dim]]
             # i-dim batch function argument
-            batch_arg = sum_batch + diff_t_batch @ leg_roots
+            batch_arg = sum_batch + diff_batch.reshape(-1, 1) @ leg_roots
+
+            batch_args.append(batch_arg.astype(dtype, copy=False))
+            batch_diffs.append(diff_batch)
+        yield batch_args, batch_diffs
 
-            batch_args.append(batch_arg)
-            cnt_reps.append(len(sum_batch))
 
-        f_val = ndfunc(repeat_args(batch_args, roots_count, cnt_reps))
-        fw_mul = np.matmul(f_val, nd_leg_weights)
-        result_list.append(fw_mul)
+def _integrate_block(ndfunc, leg_weights, transform, block, timed=False, cellwise=False, batch_size=None):
+    """ Integrates function on block of grid cells, returns also its BatchStats if 'timed'.
+
+    BatchStats report 'batch_size' planned for blocks, edge blocks of grid may be smaller.
+
+    Integrals of each cell of the block are returned instead of their sum if 'cellwise'.
+
+    Curvilinear coordinates are transformed with tables of functions of each coordinate
+    computed for the block, instead of transforming each point.
+    """
+    start = time.perf_counter() if timed else None
+    f_args = _block_arguments(transform, block)
+    args_end = time.perf_counter() if timed else None
+    return _block_integral(ndfunc(f_args), f_args, leg_weights, transform, block,
+                           (start, args_end) if timed else None, cellwise, batch_size)
+
+
+async def _integrate_block_async(ndfunc, leg_weights, transform, block, timed=False, batch_size=None):
+    """ Integrates coroutine function on block of grid cells, see '_integrate_block'. """
+    start = time.perf_counter() if timed else None
+    f_args = _block_arguments(transform, block)
+    args_end = time.perf_counter() if timed else None
+    f_val = ndfunc(f_args)
+    if inspect.isawaitable(f_val):
+        f_val = await f_val
+    return _block_integral(f_val, f_args, leg_weights, transform, block, (start, args_end) if timed else None,
+                           batch_size=batch_size)
+
+
+def _block_arguments(transform, block):
+    """ Function arguments on cartesian product of block cells and roots. """
+    batch_args, _ = block
+    return tensor_args(batch_args) if transform is None else transform.tensor_cartesian(batch_args)
+
+
+def _block_integral(f_val, f_args, leg_weights, transform, block, times=None, cellwise=False, batch_size=None):
+    """ Integral of block from function values, 'times' are start and arguments end times if block is timed. """
+    batch_args, batch_diffs = block
+    f_val = broadcast_values(f_val, f_args.shape[1:])
+    if transform is not None:
+        f_val = transform.tensor_jacobian(f_val, batch_args)
+    function_end = time.perf_counter() if times is not None else None
+    # roots axes are contracted with legendre weights axis by axis and cells axes with grid steps
+    fw_mul = contract(f_val, *len(batch_args) * [leg_weights])
+    fw_mul = fw_mul.astype(np.result_type(fw_mul, np.float64), copy=False)
+    if cellwise:
+        value = fw_mul * functools.reduce(np.multiply.outer, batch_diffs)
     else:
-        nest_id += 1
-        while batch_position[nest_id] < ndgrid[nest_id].nodes_count - 1:
-            _integration_loop(result_list, ndfunc, ndgrid, nd_leg_weights, leg_roots, roots_count,
-                              batch_position, batch_size, nest_id)
-            batch_position[nest_id] += batch_size[nest_id]
-        batch_position[nest_id] = 0
-
-
-def _build_integration_meta(ndgrid):
-    for g in ndgrid:
-        g.sum = ((g.nodes[1:] + g.nodes[:-1]) / 2.0).reshape(-1, 1)
-        g.diff = (g.nodes[1:] - g.nodes[:-1]) / 2.0
-        g.diff_t = g.diff.reshape(-1, 1)
-        g.nodes_count = len(g.nodes)
+        # contraction with float64 grid steps accumulates integrals of cells in float64
+        value = contract(fw_mul, *batch_diffs)
+    if times is None:
+        return value
+    start, args_end = times
+    times = {
+        "arguments": args_end - start,
+        "function": function_end - args_end,
+        "reduction": time.perf_counter() - function_end,
+    }
+    return value, BatchStats("integration", f_args[0].size, times, f_args.nbytes + f_val.nbytes + fw_mul.nbytes,
+                             batch_size)
+
+
+def _map_blocks(func, blocks, executor, workers):
+    """ Lazily applies function to blocks serially or in a pool, results are kept in blocks order. """
+    if executor is None and workers is None:
+        yield from map(func, blocks)
+        return
+    # workers evaluate blocks with default dtype of the calling thread
+    func = functools.partial(_in_precision, get_dtype(), func)
+    if isinstance(executor, Executor):
+        yield from executor.map(func, blocks)
+        return
+
+    executor = executor or "thread"
+    if executor not in _EXECUTORS:
+        raise ValueError(f"Executor '{executor}' is not valid. Please use 'thread', 'process' or "
+                         f"concurrent.futures.Executor object.")
+    with _EXECUTORS[executor](max_workers=workers) as pool:
+        yield from pool.map(func, blocks)
+
+
+def _in_precision(dtype, func, block):
+    """ Applies function to block with default dtype of the thread which started integration. """
+    with precision(dtype):
+        return func(block)
+
+
+def plan_batch_size(ndgrid, roots_count: int = 32, memory_limit: int = None, dtype=None, values_size: int = 1):
+    """ The largest batch of grid cells which arrays fit into memory limit.
+
+    Block of cells takes function arguments, function values and their products with weights
+    for each of (cells count) * roots_count ** dim points.
+
+    Args:
+        ndgrid: area.grid.Grid object.
+        roots_count: count of zero roots in Legendre polynomial.
+        memory_limit: int, bytes of arrays of a block, DEFAULT_MEMORY_LIMIT if None.
+        dtype: floating data type of function arguments, the default one if None.
+        values_size: int, count of function values at each point, e.g. 3 for a function with values shape (3,).
+
+    Returns:
+        tuple, max count of grid cells along each dimension in a block.
+    """
+    if values_size < 1:
+        raise ValueError(f"Count of function values must be positive. {values_size} < 1")
+    dtype = resolve_dtype(dtype)
+    bytes_per_point = (ndgrid.dim + 2 * values_size) * dtype.itemsize
+    max_points = max((memory_limit or DEFAULT_MEMORY_LIMIT) // bytes_per_point, 1)
+    cells_count = [max(g.nodes_count - 1, 1) for g in ndgrid]
+    return _bounded_batch_size(cells_count, roots_count, min(max_points, MAX_BATCH_POINTS))
+
+
+def _quadrature(ndgrid, coords_type, roots_count, dtype):
+    """ Coordinates transform, Legendre roots and tensor weights of Gauss formula on grid. """
+    _check_cells(ndgrid)
+    transform = get_transform(coords_type)
+    if transform is not None and transform.dim not in (None, ndgrid.dim):
+        raise ValueError(f"Coordinates '{coords_type}' are {transform.dim}-dimensional, "
+                         f"but grid is {ndgrid.dim}-dimensional.")
+    dtype = resolve_dtype(dtype)
+
+    leg_roots, _ = leggauss_rule(roots_count, np.float64)
+    leg_roots = leg_roots.reshape(1, -1)
+    # one-dimensional weights are contracted with each roots axis of function values
+    _, leg_weights = leggauss_rule(roots_count, dtype)
+    return transform, leg_roots, leg_weights, dtype
+
+
+def _check_cells(ndgrid):
+    """ Raises ValueError if grid has no cells to integrate. """
+    if any(g.nodes_count < 2 for g in ndgrid):
+        raise ValueError(f"Grid must have at least one cell along each axis, but it has "
+                         f"{tuple(g.nodes_count for g in ndgrid)} nodes. Please check integration limits.")
+
+
+def _planned_batch_size(ndgrid, roots_count, batch_size, memory_limit, dtype, values_size=1):
+    """ Batch size given by user, planned for memory limit if it is 'auto', or the default one. """
+    if _is_auto(batch_size, memory_limit):
+        return plan_batch_size(ndgrid, roots_count, memory_limit, dtype, values_size)
+    if batch_size is None:
+        batch_size = (32,) * ndgrid.dim
+    return _bounded_batch_size(batch_size, roots_count)
+
+
+def _is_auto(batch_size, memory_limit):
+    """ Whether batch size is planned for memory limit. """
+    if isinstance(batch_size, str) and batch_size != "auto":
+        raise ValueError(f"Batch size '{batch_size}' is not valid. Please use tuple of int or 'auto'.")
+    return isinstance(batch_size, str) or memory_limit is not None
+
+
+def _point_arguments(ndgrid, leg_roots, transform, dtype):
+    """ Function arguments at the first root of the first grid cell. """
+    block = next(_integration_blocks(ndgrid, leg_roots[:, :1], (1,) * ndgrid.dim, dtype))
+    return _block_arguments(transform, block)
+
+
+def _values_size(point_values):
+    """ Count of function values at a single point, scalar values are broadcast to points. """
+    return max(int(np.size(point_values)), 1)
+
+
+def _probe_batch_size(integrate_block, ndgrid, leg_roots, roots_count, batch_size, dtype, candidates_count=4):
+    """ Batch size with the least time per point among 'batch_size' and a few smaller ones. """
+    candidates = [batch_size]
+    points = np.prod(batch_size) * roots_count ** ndgrid.dim
+    for _ in range(candidates_count - 1):
+        points //= 4
+        candidate = _bounded_batch_size(batch_size, roots_count, max(points, 1))
+        if candidate != candidates[-1]:
+            candidates.append(candidate)
+
+    best_size, best_time = batch_size, np.inf
+    for candidate in candidates:
+        block = next(_integration_blocks(ndgrid, leg_roots, candidate, dtype))
+        start = time.perf_counter()
+        integrate_block(block)
+        point_time = (time.perf_counter() - start) / np.prod([arg.size for arg in block[0]])
+        if point_time < best_time:
+            best_size, best_time = candidate, point_time
+    return best_size
+
+
+def _bounded_batch_size(batch_size, roots_count, max_points=MAX_BATCH_POINTS):
+    """ Decreases batch size until count of points evaluated in a batch doesn't exceed 'max_points'. """
+    batch_size = list(batch_size)
+    while np.prod(batch_size) * roots_count ** len(batch_size) > max_points and max(batch_size) > 1:
+        largest = int(np.argmax(batch_size))
+        batch_size[largest] = (batch_size[largest] + 1) // 2
+    return tuple(batch_size)
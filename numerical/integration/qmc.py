@@ -0,0 +1,169 @@
+""" Randomized quasi-Monte Carlo integration.
+
+Function is evaluated on several independently scrambled Halton sequences.
+Each scrambled sequence gives an unbiased integral estimate, the spread of
+these estimates is the standard error of their mean. Convergence doesn't
+depend on smoothness of function or tensor structure of the area, so it suits
+high-dimensional and non-smooth functions.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from numerical.precision import resolve_dtype, cast
+from numerical.utils.summation import CompensatedSum
+from numerical.coordinates import coordinate_transform
+from numerical.utils.integration import broadcast_values
+
+
+QMCEstimate = namedtuple("QMCEstimate", ["integral", "error", "evaluations"])
+
+
+def integrate(ndfunc: "numpy function",
+              *bounds: "integration limits",
+              coords_type="cartesian",
+              atol: float = 0.,
+              rtol: float = 0.,
+              max_evaluations: int = 2 ** 20,
+              batch_size: int = 2 ** 12,
+              replicates: int = 8,
+              seed=None,
+              dtype=None):
+    """ Integrate a function numerically using randomized quasi-Monte Carlo method.
+
+    Integration stops when standard error doesn't exceed max(atol, rtol * |integral|)
+    or when count of function evaluations reaches 'max_evaluations'.
+
+    Args:
+        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        coords_type: str, type of coordinates for integration ('cartesian', 'polar', 'cylindrical',
+            'spherical') or numerical.coordinates.CoordinateTransform object.
+        atol: float, absolute tolerance of standard error.
+        rtol: float, relative tolerance of standard error.
+        max_evaluations: int, max count of function evaluations, at least 'replicates'.
+        batch_size: int, count of sequence points evaluated at once for each replicate,
+            it is reduced if the first batch exceeds 'max_evaluations'.
+        replicates: int, count of independently scrambled sequences, at least 2.
+        seed: seed of random scrambling, see numpy.random.RandomState.
+        dtype: floating data type of function arguments, the default one if None.
+
+    Returns:
+        QMCEstimate with integral value, its standard error and count of function evaluations.
+    """
+    if max_evaluations < replicates:
+        raise ValueError(f"Max evaluations must be enough for a point of each of {replicates} replicates.")
+    batch_size = min(batch_size, max_evaluations // replicates)
+    estimate = None
+    for estimate in integrate_iter(ndfunc, *bounds, coords_type=coords_type, batch_size=batch_size,
+                                   replicates=replicates, seed=seed, dtype=dtype):
+        if np.all(estimate.error <= np.maximum(atol, rtol * np.abs(estimate.integral))) or \
+                estimate.evaluations + batch_size * replicates > max_evaluations:
+            break
+    return estimate
+
+
+def integrate_iter(ndfunc: "numpy function",
+                   *bounds: "integration limits",
+                   coords_type="cartesian",
+                   batch_size: int = 2 ** 12,
+                   replicates: int = 8,
+                   seed=None,
+                   dtype=None):
+    """ Integrate a function numerically using randomized quasi-Monte Carlo method batch by batch.
+
+    Args:
+        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        coords_type: str, type of coordinates for integration ('cartesian', 'polar', 'cylindrical',
+            'spherical') or numerical.coordinates.CoordinateTransform object.
+        batch_size: int, count of sequence points evaluated at once for each replicate.
+        replicates: int, count of independently scrambled sequences, at least 2.
+        seed: seed of random scrambling, see numpy.random.RandomState.
+        dtype: floating data type of function arguments, the default one if None.
+            Sums of function values are accumulated in float64.
+
+    Yields:
+        QMCEstimate with integral value, its standard error and count of function evaluations
+        after each batch. Sequence is infinite, so generator never stops.
+    """
+    if replicates < 2:
+        raise ValueError(f"At least 2 replicates are required for error estimate. {replicates} < 2")
+
+    bounds = np.array(bounds, dtype=np.float64).reshape(-1, 2)
+    lower = bounds[:, 0].reshape(-1, 1, 1)
+    sizes = np.diff(bounds, axis=1).reshape(-1, 1, 1)
+    volume = np.prod(sizes)
+    ndfunc = coordinate_transform(ndfunc, coords_type)
+    sequence = ScrambledHalton(len(bounds), replicates, seed)
+    dtype = resolve_dtype(dtype)
+
+    sums = CompensatedSum()
+    points_count = 0
+    while True:
+        args = (lower + sizes * sequence.points(points_count, batch_size)).astype(dtype)
+        f_val = broadcast_values(ndfunc(args), args.shape[1:])
+        sums.add(np.sum(f_val, axis=-1, dtype=np.result_type(f_val, np.float64)))
+        points_count += batch_size
+
+        estimates = sums.value * volume / points_count
+        yield QMCEstimate(cast(np.mean(estimates, axis=-1), dtype)[()],
+                          cast(np.std(estimates, axis=-1, ddof=1) / np.sqrt(replicates), dtype)[()],
+                          points_count * replicates)
+
+
+class ScrambledHalton:
+    """ Halton low-discrepancy sequences with random permutations of digits.
+
+    Each replicate has its own permutations for every digit of every base,
+    so replicates are independent randomizations of the same sequence.
+    """
+    def __init__(self, dim: int, replicates: int = 1, seed=None):
+        rng = np.random.RandomState(seed)
+        self.dim = dim
+        self.replicates = replicates
+        self.bases = _primes(dim)
+        self._permutations = []
+        for base in self.bases:
+            # digits below float64 precision don't change points
+            digits_count = int(np.ceil(53 * np.log(2) / np.log(base)))
+            self._permutations.append(np.argsort(rng.random_sample((replicates, digits_count, base)), axis=-1))
+
+    def points(self, start: int, count: int):
+        """ Points of sequences with indexes start, ..., start + count - 1.
+
+        Returns:
+            numpy.ndarray with shape (dim, replicates, count) in the unit cube.
+        """
+        indexes = np.arange(start, start + count, dtype=np.int64)
+        points = np.empty((self.dim, self.replicates, count))
+        for i, (base, permutations) in enumerate(zip(self.bases, self._permutations)):
+            points[i] = _radical_inverse(indexes, base, permutations)
+        return points
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: dim={self.dim}, replicates={self.replicates}>"
+
+
+def _radical_inverse(indexes, base, permutations):
+    """ Radical inverse of indexes in base with digits permuted for each replicate. """
+    result = np.zeros((permutations.shape[0], len(indexes)))
+    replicates = np.arange(permutations.shape[0]).reshape(-1, 1)
+    factor = 1. / base
+    for digit_id in range(permutations.shape[1]):
+        digits = indexes % base
+        result += permutations[replicates, digit_id, digits] * factor
+        indexes = indexes // base
+        factor /= base
+    return result
+
+
+def _primes(count):
+    """ First 'count' prime numbers. """
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
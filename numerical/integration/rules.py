@@ -0,0 +1,62 @@
+""" Process-wide cache of Gauss-Legendre quadrature rules.
+
+Computing Legendre roots and weights is a fixed cost of every integration call.
+Rules are cached with LRU eviction, so repeated integrals with the same roots
+count skip this setup. Only one-dimensional rules are cached: tensor product
+rules are applied by contracting function values with 1-d weights axis by axis.
+Cache may be filled in advance with 'warm_cache' at application startup.
+"""
+from functools import lru_cache
+
+from numpy.polynomial.legendre import leggauss
+
+from numerical.precision import resolve_dtype
+
+
+RULES_CACHE_SIZE = 128
+
+
+def leggauss_rule(roots_count: int, dtype=None):
+    """ One-dimensional Gauss-Legendre rule on the interval [-1, 1].
+
+    Args:
+        roots_count: count of zero roots in Legendre polynomial.
+        dtype: data type of roots and weights, the default one if None.
+    Returns:
+        tuple of read-only numpy.ndarray (roots, weights).
+    """
+    return _leggauss_rule(int(roots_count), resolve_dtype(dtype))
+
+
+def cache_info():
+    """ Hits, misses and size of rules cache. """
+    return _leggauss_rule.cache_info()
+
+
+def cache_clear():
+    """ Removes all cached rules and resets statistics. """
+    _leggauss_rule.cache_clear()
+
+
+def warm_cache(roots_counts=(32,), dtype=None):
+    """ Computes rules in advance, e.g. at application startup.
+
+    Args:
+        roots_counts: iterable of roots counts.
+        dtype: data type of rules, the default one if None.
+    """
+    for roots_count in roots_counts:
+        leggauss_rule(roots_count, dtype)
+
+
+@lru_cache(maxsize=RULES_CACHE_SIZE)
+def _leggauss_rule(roots_count, dtype):
+    roots, weights = leggauss(roots_count)
+    # rules of lower precision are rounded from float64 ones
+    return _read_only(roots.astype(dtype)), _read_only(weights.astype(dtype))
+
+
+def _read_only(array):
+    # cached arrays are shared between callers and must not be modified
+    array.setflags(write=False)
+    return array
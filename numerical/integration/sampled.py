@@ -0,0 +1,133 @@
+""" Integration of values sampled in grid nodes.
+
+Each method is a weighted sum of node values, where weights of a tensor grid
+are products of one-dimensional weights of its axes. Integral is computed as a
+contraction of values with weights of each axis, so no function is evaluated and
+values are read once, slab by slab along the first axis.
+
+Methods:
+    trapezoid, linear: exact integral of linear interpolation.
+    simpson: composite Simpson rule on pairs of cells, nodes count along each axis must be odd.
+    cubic, schoenberg, int degree: exact integral of B-spline interpolation built by
+        numerical.interpolate with the same kind. Integral is linear in spline coefficients,
+        which are linear in values, so weights of values are integrals of basis functions
+        solved with the transposed prefilter system once per axis.
+"""
+import os
+
+import numpy as np
+
+from numerical.area.grid import UniformGrid, RectilinearGrid
+from numerical.interpolation import basis_function
+from numerical.precision import DEFAULT_MEMORY_LIMIT, resolve_dtype, cast
+from numerical.utils.interpolation import prefilter_bands, prefilter_extrapolation, prefilter_width
+from numerical.utils.linalg import contract, solve_banded, transpose_bands
+from numerical.utils.summation import CompensatedSum
+
+
+# methods given by name, B-splines of other degrees are given by int
+_METHODS = ("trapezoid", "linear", "simpson", "cubic", "schoenberg")
+
+
+def integrate(values, ndgrid, method="trapezoid", batch_size: int = None, dtype=None):
+    """ Integrate function given by its values in grid nodes.
+
+    Args:
+        values: numpy.ndarray with shape (values shape) + grid shape, numpy.memmap or path to .npy file,
+            which is opened as memmap.
+        ndgrid: UniformGrid or RectilinearGrid object, nodes where values were computed.
+            Splines are uniform in node index coordinates of RectilinearGrid as in numerical.interpolate.
+        method: str or int, 'trapezoid', 'linear', 'simpson', 'cubic', 'schoenberg' or int degree of B-spline.
+        batch_size: int, count of nodes along the first grid axis read at once, slabs of about 64 MiB if None.
+        dtype: floating data type of result, the default one if None. Sum is accumulated in float64.
+
+    Returns:
+        numpy.ndarray with values shape, integral of function over grid area.
+    """
+    if not isinstance(ndgrid, (UniformGrid, RectilinearGrid)):
+        raise ValueError("Grid must be UniformGrid or RectilinearGrid object.")
+    if isinstance(values, (str, os.PathLike)):
+        values = np.load(values, mmap_mode="r")
+    values = values if isinstance(values, np.ndarray) else np.asarray(values)
+    leading = values.ndim - ndgrid.dim
+    if leading < 0 or values.shape[leading:] != ndgrid.shape:
+        raise ValueError(f"Values shape {values.shape} doesn't match grid shape {ndgrid.shape}.")
+
+    weights = [sampled_weights(axis_grid, method) for axis_grid in ndgrid]
+    if batch_size is None:
+        slab_bytes = values.itemsize * np.prod(values.shape) // ndgrid.shape[0]
+        batch_size = max(int(DEFAULT_MEMORY_LIMIT // max(slab_bytes, 1)), 1)
+
+    result = CompensatedSum()
+    for position in range(0, ndgrid.shape[0], batch_size):
+        slab = (slice(None),) * leading + (slice(position, position + batch_size),)
+        # contraction with float64 weights accumulates slab integral in float64
+        result.add(contract(np.asarray(values[slab]), weights[0][position:position + batch_size], *weights[1:]))
+    return cast(result.value, resolve_dtype(dtype))[()]
+
+
+def sampled_weights(axis_grid, method="trapezoid"):
+    """ Weights of node values along one axis.
+
+    Args:
+        axis_grid: one-dimensional grid, axis of UniformGrid or RectilinearGrid.
+        method: str or int, see 'integrate'.
+    Returns:
+        numpy.ndarray of float64 weights with shape (nodes count,).
+    """
+    if method not in _METHODS and (not isinstance(method, int) or isinstance(method, bool) or method < 1):
+        raise ValueError(f"Integration method '{method}' is not valid. Please use 'trapezoid', 'linear', 'simpson', "
+                         f"'cubic', 'schoenberg' or positive degree of B-spline.")
+    widths = np.diff(axis_grid.nodes)
+    if method in ("trapezoid", "linear"):
+        weights = np.zeros(len(widths) + 1)
+        weights[:-1] += widths / 2.
+        weights[1:] += widths / 2.
+        return weights
+    if method == "simpson":
+        return _simpson_weights(widths)
+    bfunc = basis_function(method)
+    if bfunc.kernel.degree == 1:
+        return sampled_weights(axis_grid, "trapezoid")
+    return _spline_weights(widths, bfunc)
+
+
+def _simpson_weights(widths):
+    """ Weights of composite Simpson rule on pairs of cells with any widths. """
+    if len(widths) % 2:
+        raise ValueError(f"Simpson rule needs even count of cells along each axis. Axis has {len(widths)} cells.")
+    h0, h1 = widths[::2], widths[1::2]
+    pair = h0 + h1
+    weights = np.zeros(len(widths) + 1)
+    # quadratic through three nodes integrated over the pair of cells
+    weights[:-1:2] += pair / 6. * (2. - h1 / h0)
+    weights[1::2] += pair ** 3 / (6. * h0 * h1)
+    weights[2::2] += pair / 6. * (2. - h0 / h1)
+    return weights
+
+
+def _spline_weights(widths, bfunc):
+    """ Weights of values which give exact integral of spline interpolation, see 'prefilter'. """
+    count = len(widths) + 1
+    padding = prefilter_width(bfunc)
+    start, end = bfunc.kernel.support
+    # integrals of basis function over unit cells at offsets from its node
+    offsets = np.arange(int(np.floor(start)), int(np.ceil(end)))
+    cell_integrals = bfunc.kernel.integral(offsets, offsets + 1)
+
+    # integral of each basis function of padded nodes, cells are scaled by their widths
+    nodes = np.arange(-padding, count + padding)
+    basis_integrals = np.zeros(len(nodes))
+    for offset, cell_integral in zip(offsets, cell_integrals):
+        cells = nodes + offset
+        inside = np.logical_and(cells >= 0, cells < count - 1)
+        basis_integrals[inside] += widths[cells[inside]] * cell_integral
+
+    # outside coefficients are extrapolated from inner ones, their integrals are moved to inner nodes
+    extrapolation = prefilter_extrapolation(bfunc)
+    stencil = extrapolation.shape[1]
+    coefficient_weights = basis_integrals[padding:padding + count].copy()
+    coefficient_weights[:stencil] += basis_integrals[padding - 1::-1] @ extrapolation
+    coefficient_weights[:-stencil - 1:-1] += basis_integrals[padding + count:] @ extrapolation
+    # weights w of coefficients c = A^-1 v are weights A^-T w of values v
+    return solve_banded(transpose_bands(prefilter_bands(count, bfunc)), coefficient_weights)
@@ -0,0 +1,107 @@
+""" Numerical integration on Smolyak sparse grids.
+
+Sparse grid is a combination of tensor products of one-dimensional
+Gauss-Legendre rules with small total count of roots, so count of
+points grows polynomially with dimension instead of exponentially.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from numerical.integration.rules import leggauss_rule
+from numerical.utils.combinatorics import comb
+from numerical.precision import MAX_BATCH_POINTS, resolve_dtype, cast
+from numerical.utils.linalg import multi_dot
+from numerical.utils.summation import CompensatedSum
+from numerical.coordinates import coordinate_transform
+from numerical.utils.integration import broadcast_values
+
+
+def integrate(ndfunc: "numpy function",
+              *bounds: "integration limits",
+              level: int = 6,
+              coords_type="cartesian",
+              batch_size: int = MAX_BATCH_POINTS,
+              dtype=None):
+    """ Integrate a function numerically using Smolyak sparse grid of Gauss-Legendre rules.
+
+    Args:
+        ndfunc: function which takes numpy.ndarray where the first shape equal to n, where n is a count of variables.
+        bounds: tuple of floats which indicate integration limits
+        level: int, level of sparse grid, integral is exact for polynomials of total degree 2 * level - 1.
+        coords_type: str, type of coordinates for integration ('cartesian', 'polar', 'cylindrical',
+            'spherical') or numerical.coordinates.CoordinateTransform object.
+        batch_size: int, max count of points where function is evaluated at once.
+        dtype: floating data type of function arguments, the default one if None.
+            Weighted sums of function values are accumulated in float64.
+
+    Returns:
+        numpy.ndarray values of function integral in the area.
+    """
+    bounds = np.array(bounds, dtype=np.float64).reshape(-1, 2)
+    center = bounds.mean(axis=1).reshape(-1, 1)
+    half = (np.diff(bounds, axis=1) / 2.).reshape(-1, 1)
+    points, weights = sparse_grid(level, len(bounds))
+    ndfunc = coordinate_transform(ndfunc, coords_type)
+    dtype = resolve_dtype(dtype)
+
+    result = CompensatedSum()
+    for position in range(0, len(weights), batch_size):
+        args = (center + half * points[position:position + batch_size].T).astype(dtype)
+        f_val = broadcast_values(ndfunc(args), args.shape[1:])
+        # float64 weights promote sum of batch to float64
+        result.add(np.matmul(f_val, weights[position:position + batch_size]))
+    return cast(result.value * np.prod(half), dtype)[()]
+
+
+def sparse_grid(level: int, dim: int, dtype=np.float64):
+    """ Smolyak sparse grid on the cube [-1, 1]^dim.
+
+    Args:
+        level: int, level of sparse grid.
+        dim: int, dimension of the cube.
+        dtype: data type of points and weights.
+    Returns:
+        tuple of read-only numpy.ndarray (points, weights) with shapes (points count, dim) and (points count,).
+    """
+    if level < 1:
+        raise ValueError(f"Level of sparse grid must be positive. {level} < 1")
+    return _sparse_grid(int(level), int(dim), np.dtype(dtype))
+
+
+def cache_info():
+    """ Hits, misses and size of sparse grids cache. """
+    return _sparse_grid.cache_info()
+
+
+@lru_cache(maxsize=32)
+def _sparse_grid(level, dim, dtype):
+    points, weights = [], []
+    # combination technique: tensor rules which total level is between level - dim + 1 and level
+    for roots_counts in _multi_indexes(dim, level + dim - 1):
+        total = sum(roots_counts) - dim + 1
+        if total < level - dim + 1:
+            continue
+        coefficient = (-1) ** (level - total) * comb(dim - 1, level - total)
+        roots, rule_weights = zip(*[leggauss_rule(count) for count in roots_counts])
+        points.append(np.stack(np.meshgrid(*roots, indexing="ij"), -1).reshape(-1, dim))
+        weights.append(coefficient * np.ravel(multi_dot(*rule_weights)))
+
+    # rules share some points (e.g. the center), their weights are joined
+    points, inverse = np.unique(np.round(np.concatenate(points), 14), axis=0, return_inverse=True)
+    weights = np.bincount(np.ravel(inverse), weights=np.concatenate(weights))
+    points, weights = points.astype(dtype), weights.astype(dtype)
+    points.setflags(write=False)
+    weights.setflags(write=False)
+    return points, weights
+
+
+def _multi_indexes(dim, max_sum):
+    """ Yields tuples of 'dim' positive integers which sum doesn't exceed 'max_sum'. """
+    if dim == 1:
+        for i in range(1, max_sum + 1):
+            yield i,
+        return
+    for i in range(1, max_sum - dim + 2):
+        for tail in _multi_indexes(dim - 1, max_sum - i):
+            yield (i,) + tail
@@ -0,0 +1,117 @@
+""" Summed-area tables of integrals of grid cells.
+
+Table value at nodes (i_1, ..., i_n) is the integral over the box from the first
+grid node to these nodes, i.e. n-dimensional prefix sum of cells integrals.
+Integral over any box with grid nodes in corners is a sum of 2^n table values
+with alternating signs, and the table restricted to one axis is a cumulative
+integral (antiderivative) along this axis.
+"""
+import itertools
+
+import numpy as np
+
+
+class SummedAreaTable:
+    """ Prefix sums of cells integrals which answer integrals over boxes of grid nodes.
+
+    Prefix sums are accumulated in float64, so integral over a small box far from the first
+    node loses about log10(total / box integral) digits in cancellation.
+
+    Args:
+        cells: numpy.ndarray with shape (values shape) + (cells count 1, ..., cells count n),
+            integrals of grid cells, e.g. result of numerical.integration.gauss.integrate_cells.
+        ndgrid: area.grid.Grid object which cells are integrated, it is needed for boxes given by coordinates.
+            Cells of scalar function are assumed if None.
+    """
+    def __init__(self, cells, ndgrid=None):
+        cells = np.asarray(cells)
+        self.ndgrid = ndgrid
+        self.dim = ndgrid.dim if ndgrid is not None else cells.ndim
+        cells_shape = cells.shape[cells.ndim - self.dim:]
+        if ndgrid is not None and cells_shape != tuple(g.nodes_count - 1 for g in ndgrid):
+            raise ValueError(f"Cells shape {cells_shape} doesn't match grid {ndgrid}.")
+        self.values_shape = cells.shape[:cells.ndim - self.dim]
+
+        self.table = np.zeros(self.values_shape + tuple(count + 1 for count in cells_shape),
+                              dtype=np.result_type(cells, np.float64))
+        self.table[(Ellipsis,) + (slice(1, None),) * self.dim] = cells
+        for axis in range(self.table.ndim - self.dim, self.table.ndim):
+            np.cumsum(self.table, axis=axis, out=self.table)
+
+    @property
+    def shape(self):
+        """ Count of nodes along each axis. """
+        return self.table.shape[self.table.ndim - self.dim:]
+
+    @property
+    def total(self):
+        """ Integral over the whole grid area. """
+        return self.table[(Ellipsis,) + (-1,) * self.dim]
+
+    def box(self, lower, upper):
+        """ Integrals over boxes between grid nodes.
+
+        Args:
+            lower: array-like with shape (n,) or (n, boxes count), indexes of the first nodes of boxes.
+            upper: array-like with the same shape, indexes of the last nodes of boxes.
+        Returns:
+            numpy.ndarray with shape (values shape) + (boxes count,) or values shape for a single box.
+        """
+        lower, upper = np.asarray(lower, dtype=np.intp), np.asarray(upper, dtype=np.intp)
+        if len(lower) != self.dim or lower.shape != upper.shape:
+            raise ValueError(f"Nodes indexes must be given for each of {self.dim} axes.")
+        shape = np.reshape(self.shape, (-1,) + (1,) * (lower.ndim - 1))
+        if np.any(lower < 0) or np.any(upper >= shape) or np.any(lower > upper):
+            raise ValueError("Boxes must be bounded by grid nodes with lower <= upper.")
+
+        result = 0.
+        for corner in itertools.product((False, True), repeat=self.dim):
+            index = tuple(np.where(is_upper, u, l) for is_upper, l, u in zip(corner, lower, upper))
+            # corner with k lower nodes is added with sign (-1)^k
+            sign = -1. if (self.dim - sum(corner)) % 2 else 1.
+            result = result + sign * self.table[(Ellipsis,) + index]
+        return result
+
+    def integral(self, *bounds):
+        """ Integrals over boxes given by coordinates of grid nodes.
+
+        Args:
+            bounds: floats or arrays of floats (lower 1, upper 1, ..., lower n, upper n), limits of boxes
+                which must be grid nodes.
+        Returns:
+            numpy.ndarray, see 'box'.
+        """
+        if self.ndgrid is None:
+            raise ValueError("Grid is required to find boxes given by coordinates.")
+        if len(bounds) != 2 * self.dim:
+            raise ValueError(f"Bounds must be given for each of {self.dim} axes.")
+        indexes = [_node_index(self.ndgrid[i // 2], b) for i, b in enumerate(bounds)]
+        return self.box(np.array(indexes[::2]), np.array(indexes[1::2]))
+
+    def cumulative(self, axis: int):
+        """ Cumulative integral along axis over the whole area of other axes.
+
+        Args:
+            axis: int, axis of grid.
+        Returns:
+            numpy.ndarray with shape (values shape) + (nodes count,), integrals from the first node
+            to each node along axis.
+        """
+        index = [-1] * self.dim
+        index[axis] = slice(None)
+        return self.table[(Ellipsis,) + tuple(index)]
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: shape={self.shape}, values_shape={self.values_shape}>"
+
+
+def _node_index(axis_grid, x):
+    """ Indexes of grid nodes which coordinates are 'x'. """
+    nodes = axis_grid.nodes
+    x = np.asarray(x, dtype=np.float64)
+    index = np.clip(np.searchsorted(nodes, x), 1, len(nodes) - 1)
+    # the nearest of two nodes around each coordinate
+    index = np.where(np.abs(nodes[index - 1] - x) <= np.abs(nodes[index] - x), index - 1, index)
+    if not np.allclose(nodes[index], x, rtol=0., atol=1e-9 * (nodes[-1] - nodes[0])):
+        raise ValueError("Bounds of boxes must be grid nodes.")
+    return index
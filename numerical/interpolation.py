@@ -1,28 +1,113 @@
+import functools
+import itertools
+import os
+import time
+
 import numpy as np
+import scipy.sparse
 
 from numerical import splines
-from numerical.utils.interpolation import repeat_args
+from numerical.area.grid import UniformGrid, RectilinearGrid
+from numerical.precision import DEFAULT_MEMORY_LIMIT, resolve_dtype, cast
+from numerical.utils.stats import BatchStats
+from numerical.utils.interpolation import local_support, tensor_gather, tensor_indexes, tensor_weights, prefilter, \
+    prefilter_width
+
+
+# B-spline degrees of interpolation kinds
+_KINDS = {
+    "linear": 1,
+    "cubic": 3,
+    "schoenberg": 5,
+}
 
 
-def interpolate(values, grid, batch_size=16):
+def interpolate(values, grid, batch_size=None, kind="linear", dtype=None, stats=None, cache=None,
+                memory_limit=None):
     """ Builds function which is an interpolation function on nodes with computer values in these nodes.
 
+    Interpolated function has methods for its derivatives, which are computed
+    in the same pass as function values:
+        deriv(x, order) - partial derivative of order (order_1, ..., order_n),
+        gradient(x) - tuple (values, gradient),
+        hessian(x) - tuple (values, gradient, hessian),
+    and method evaluate(chunks) which lazily yields function values for each chunk of points.
+
+    Values may be a numpy.memmap or a path to .npy file which is opened as memmap. Such values
+    aren't copied or converted for linear interpolation: each batch of points reads only grid nodes
+    around these points, in the order of the file. Use grid object (e.g. UniformGrid with 'counts')
+    instead of meshgrid arrays to keep the whole interpolant out of memory.
+
     Args:
-        values: list of function values in grid nodes.
-        grid: points where function was calculated used np.meshgrid function with parameter 'indexing='ij''.
-        batch_size: int, batch size for interpolation process.
+        values: list of function values in grid nodes, numpy.memmap or path to .npy file.
+        grid: points where function was calculated used np.meshgrid function with parameter 'indexing='ij''
+            or UniformGrid, RectilinearGrid object, then values shape equals to grid shape.
+            Points are located in cells of RectilinearGrid with binary search, B-splines of degree > 1
+            are uniform in node index coordinates of such grid.
+        batch_size: int, count of points evaluated at once, the largest batch which arrays fit into
+            DEFAULT_MEMORY_LIMIT if None, or 'auto' for the largest batch which arrays fit into 'memory_limit'.
+            Chosen batch size
+            is available as 'batch_size' attribute of interpolated function.
+        kind: str or int, basis functions of interpolation: 'linear', 'cubic', 'schoenberg'
+            (B-spline of 5-th degree, which is Schoenberg spline) or int degree of B-spline.
+            Coefficients of basis functions of degree > 1 are computed once with prefilter which solves
+            interpolation conditions along each axis.
+        dtype: floating data type of coefficients, points and results, the default one if None.
+            Coefficients are computed in float64 and rounded to 'dtype' once.
+        stats: callable, e.g. numerical.Stats object, which is called with BatchStats
+            of each batch of points with times of basis evaluation, gathering of node values and reduction,
+            and batch size chosen for batches.
+        cache: numerical.cache.ResultCache object, coefficients of basis functions of degree > 1 are taken
+            from cache if they were computed for the same values, grid and kind.
+        memory_limit: int, bytes of arrays of a batch of points, batch size is automatic if it is given.
 
     Returns:
         interpolated function.
     """
-    # linear interpolation will be used as a basis function
-    bfunc = splines.linear
+    bfunc = basis_function(kind)
+    padding = 0
+    if isinstance(values, (str, os.PathLike)):
+        values = np.load(values, mmap_mode="r")
+    locators, nodes_count = _grid_locators(grid)
+    nodes_dim = len(nodes_count)
+    dtype = resolve_dtype(dtype)
+    if isinstance(batch_size, str) or memory_limit is not None:
+        if isinstance(batch_size, str) and batch_size != "auto":
+            raise ValueError(f"Batch size '{batch_size}' is not valid. Please use int or 'auto'.")
+        batch_size = plan_batch_size(kind, nodes_dim, memory_limit, dtype)
+    elif batch_size is None:
+        # each point gathers (degree + 1) ** dim nodes, so batches of all points are bounded as well
+        batch_size = plan_batch_size(kind, nodes_dim, DEFAULT_MEMORY_LIMIT, dtype)
+
+    values = np.reshape(values, nodes_count)
+    if bfunc is not splines.linear:
+        key = cache.key("interpolate", values, grid, bfunc.kernel.degree, dtype.str) if cache is not None else None
+        coefficients = cache.get(key) if cache is not None else None
+        if coefficients is None:
+            coefficients, _ = prefilter(values, bfunc)
+            coefficients = cast(coefficients, dtype)
+            if cache is not None:
+                # cached coefficients are shared between interpolants
+                coefficients.setflags(write=False)
+                cache.put(key, coefficients)
+        values, padding = coefficients, prefilter_width(bfunc)
+    if not isinstance(values, np.memmap):
+        values = cast(values, dtype)
+    result_dtype = cast(np.empty(0, values.dtype), dtype).dtype
 
-    nodes_range = [(g.min(), g.max()) for g in grid]
-    nodes_count = grid[0].shape
-    nodes_dim = len(grid)
-    shift_indexes = [np.arange(0, dim, dtype=np.float64) for dim in nodes_count]
-    values = values.ravel()
+    def _evaluate(x, orders):
+        """ Evaluates partial derivatives of each order from 'orders' at points 'x'. """
+        shape = x.shape[1:]
+        if len(shape) > 1 and shape[-1] == 1:
+            shape = shape[:-1]
+        x = np.asarray(x, dtype=dtype).reshape(nodes_dim, -1)
+
+        result = np.empty((len(orders), x.shape[1]), dtype=result_dtype)
+        for batch_position in range(0, x.shape[1], batch_size):
+            batch = x[:, batch_position:batch_position + batch_size]
+            result[:, batch_position:batch_position + batch_size] = _local_interpolation(
+                batch, values, bfunc, padding, locators, orders, stats, batch_size)
+        return result.reshape((len(orders),) + shape)
 
     def _interpolated(x):
         """ Interpolated function.
@@ -33,32 +118,287 @@ def interpolate(values, grid, batch_size=16):
         Returns:
             numpy.ndarray
         """
+        return _evaluate(x, [(0,) * nodes_dim])[0]
+
+    def deriv(x, order):
+        """ Partial derivative of interpolated function.
+
+        Args:
+            x: numpy.ndarray
+            order: tuple of int, order of derivative for each variable, int for 1-dimensional function.
+
+        Returns:
+            numpy.ndarray
+        """
+        if not isinstance(order, tuple):
+            order = (order,)
+        if len(order) != nodes_dim:
+            raise ValueError(f"Order of derivative must be specified for each of {nodes_dim} variables.")
+        return _evaluate(x, [order])[0]
 
-        if x.shape[-1] != 1:
-            x = np.expand_dims(x, axis=-1)
+    def gradient(x):
+        """ Values and gradient of interpolated function.
 
-        result = []
-        batch_position = 0
-        _interpolation_loop(result, x, values, bfunc, nodes_range, nodes_count,
-                            nodes_dim, shift_indexes, batch_position, batch_size)
-        return np.concatenate(result)
+        Args:
+            x: numpy.ndarray
 
+        Returns:
+            tuple of numpy.ndarray (values, gradient), the first axis of gradient is a variable.
+        """
+        result = _evaluate(x, [(0,) * nodes_dim] + _unit_orders(nodes_dim))
+        return result[0], result[1:]
+
+    def hessian(x):
+        """ Values, gradient and hessian of interpolated function.
+
+        Args:
+            x: numpy.ndarray
+
+        Returns:
+            tuple of numpy.ndarray (values, gradient, hessian), the first two axes of hessian are variables.
+        """
+        pairs = list(itertools.combinations_with_replacement(range(nodes_dim), 2))
+        second_orders = [tuple(pair.count(i) for i in range(nodes_dim)) for pair in pairs]
+        result = _evaluate(x, [(0,) * nodes_dim] + _unit_orders(nodes_dim) + second_orders)
+
+        hess = np.empty((nodes_dim, nodes_dim) + result.shape[1:], dtype=result.dtype)
+        for (i, j), second in zip(pairs, result[nodes_dim + 1:]):
+            hess[i, j] = hess[j, i] = second
+        return result[0], result[1:nodes_dim + 1], hess
+
+    def evaluate(chunks):
+        """ Evaluates interpolated function on chunks of points lazily.
+
+        Args:
+            chunks: iterable of numpy.ndarray
+
+        Yields:
+            numpy.ndarray values of interpolated function for each chunk.
+        """
+        for x in chunks:
+            yield _interpolated(x)
+
+    _interpolated.deriv = deriv
+    _interpolated.gradient = gradient
+    _interpolated.hessian = hessian
+    _interpolated.evaluate = evaluate
+    _interpolated.batch_size = batch_size
     return _interpolated
 
 
-def _interpolation_loop(result, x, values, bfunc, nodes_range, nodes_count,
-                        nodes_dim, shift_indexes, batch_position, batch_size):
-    while batch_position < x.shape[1]:
-        args = []
-        for i in range(nodes_dim):
-            axis_batch = x[i][batch_position:batch_position + batch_size]
-            arg = ((nodes_count[i] - 1) * (axis_batch - nodes_range[i][0]) /
-                   (nodes_range[i][1] - nodes_range[i][0])) - shift_indexes[i]
-            args.append(arg)
-
-        rep_args = repeat_args(args, nodes_count)
-        spline_val = np.prod(np.array([bfunc(arg) for arg in rep_args]), axis=0)
-        if len(spline_val.shape) == 1:
-            spline_val = spline_val.reshape(1, -1)
-        result.append(np.dot(spline_val, values))
-        batch_position += batch_size
+def plan_batch_size(kind, dim, memory_limit=None, dtype=None):
+    """ The largest count of points which arrays fit into memory limit.
+
+    Each point takes indexes and values of its neighboring grid nodes, and weights of these nodes
+    for an order of derivative, so its memory doesn't depend on count of derivatives.
+
+    Args:
+        kind: str or int, basis functions of interpolation, see 'interpolate'.
+        dim: int, dimension of grid.
+        memory_limit: int, bytes of arrays of a batch, DEFAULT_MEMORY_LIMIT if None.
+        dtype: floating data type of interpolation, the default one if None.
+
+    Returns:
+        int, count of points evaluated at once.
+    """
+    support = basis_function(kind).kernel.support
+    nodes_per_point = int(np.ceil(support[1] - support[0])) ** dim
+    bytes_per_point = nodes_per_point * (np.dtype(np.intp).itemsize + 2 * resolve_dtype(dtype).itemsize)
+    return max(int((memory_limit or DEFAULT_MEMORY_LIMIT) // bytes_per_point), 1)
+
+
+def basis_function(kind):
+    """ Basis function of interpolation kind.
+
+    Args:
+        kind: str or int, 'linear', 'cubic', 'schoenberg' or int degree of B-spline, see 'interpolate'.
+    Returns:
+        spline function with piecewise polynomial 'kernel' attribute.
+    """
+    degree = _KINDS.get(kind, kind)
+    if not isinstance(degree, int) or isinstance(degree, bool) or degree < 1:
+        raise ValueError(f"Interpolation kind '{kind}' is not valid. Please use 'linear', 'cubic', 'schoenberg' "
+                         f"or positive degree of B-spline.")
+    # linear interpolation doesn't need prefilter
+    return splines.linear if degree == 1 else splines.bspline(degree)
+
+
+def interpolation_matrix(grid, x, kind="linear", order=None, batch_size=None, dtype=None):
+    """ Builds sparse matrix of interpolation at fixed points, which is applied to many value arrays.
+
+    Basis functions are evaluated only once, so interpolation of each value array
+    on the same grid is a single sparse product. Values of kinds of degree > 1
+    are prefiltered before the product.
+
+    Args:
+        grid: points of grid used np.meshgrid function with parameter 'indexing='ij'' or UniformGrid,
+            RectilinearGrid object, see 'interpolate'.
+        x: numpy.ndarray, points of interpolation.
+        kind: str or int, basis functions of interpolation, see 'interpolate'.
+        order: tuple of int, order of partial derivative for each variable, the function itself if None.
+        batch_size: int, count of points processed at once while building the matrix,
+            the largest batch which arrays fit into DEFAULT_MEMORY_LIMIT if None.
+        dtype: floating data type of matrix and results, the default one if None.
+
+    Returns:
+        InterpolationMatrix
+    """
+    bfunc = basis_function(kind)
+    locators, nodes_count = _grid_locators(grid)
+    nodes_dim = len(nodes_count)
+    dtype = resolve_dtype(dtype)
+    if order is None:
+        order = (0,) * nodes_dim
+    elif not isinstance(order, tuple):
+        order = (order,)
+    if len(order) != nodes_dim:
+        raise ValueError(f"Order of derivative must be specified for each of {nodes_dim} variables.")
+
+    padding = 0 if bfunc is splines.linear else prefilter_width(bfunc)
+    coefficients_count = tuple(count + 2 * padding for count in nodes_count)
+    shape = x.shape[1:]
+    if len(shape) > 1 and shape[-1] == 1:
+        shape = shape[:-1]
+    x = np.asarray(x, dtype=dtype).reshape(nodes_dim, -1)
+
+    indptr, indices, data = [np.zeros(1, dtype=np.intp)], [], []
+    if batch_size is None:
+        batch_size = plan_batch_size(kind, nodes_dim, DEFAULT_MEMORY_LIMIT, dtype)
+    for batch_position in range(0, x.shape[1], batch_size):
+        batch = x[:, batch_position:batch_position + batch_size]
+        indexes, weights = _local_weights(batch, bfunc, padding, locators, coefficients_count, [order])
+        nd_weights = tensor_weights([w[o] for w, o in zip(weights, order)])
+        # zero weights belong to nodes outside the grid or to the ends of basis support
+        nonzero = nd_weights != 0
+        indptr.append(indptr[-1][-1] + np.cumsum(np.count_nonzero(nonzero, axis=1)))
+        indices.append(tensor_indexes(indexes, coefficients_count)[nonzero])
+        data.append(nd_weights[nonzero])
+    data = cast(np.concatenate(data + [np.zeros(0, dtype=dtype)]), dtype)
+    return InterpolationMatrix(np.concatenate(indptr), np.concatenate(indices + [np.zeros(0, dtype=np.intp)]), data,
+                               coefficients_count, shape, bfunc, batch_size)
+
+
+class InterpolationMatrix:
+    """ Sparse matrix of basis functions values at points in compressed sparse row format.
+
+    Row i contains values data[indptr[i]:indptr[i + 1]] of basis functions of grid nodes
+    indices[indptr[i]:indptr[i + 1]] at i-th point, nodes are raveled in C order.
+    Nodes of basis functions of degree > 1 include padding nodes of prefiltered coefficients.
+    Matrix is kept as scipy.sparse.csr_matrix in 'matrix' attribute.
+    """
+    def __init__(self, indptr, indices, data, nodes_count, points_shape, bfunc, batch_size=None):
+        self.nodes_count = nodes_count
+        self.points_shape = points_shape
+        self.bfunc = bfunc
+        self.batch_size = batch_size
+        self.matrix = scipy.sparse.csr_matrix((data, indices, indptr),
+                                              shape=(len(indptr) - 1, int(np.prod(nodes_count))))
+
+    @property
+    def indptr(self):
+        return self.matrix.indptr
+
+    @property
+    def indices(self):
+        return self.matrix.indices
+
+    @property
+    def data(self):
+        return self.matrix.data
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def nnz(self):
+        return self.matrix.nnz
+
+    def apply(self, values):
+        """ Interpolates values in grid nodes at matrix points.
+
+        Args:
+            values: numpy.ndarray with shape of grid or stack of such arrays with shape (k, ...) + grid shape.
+
+        Returns:
+            numpy.ndarray with shape of points or (k, ...) + shape of points for stack of values.
+        """
+        values = np.asarray(values)
+        dim = len(self.nodes_count)
+        stack_shape = values.shape[:values.ndim - dim]
+        if self.bfunc is not splines.linear:
+            values, _ = prefilter(values, self.bfunc, axes=range(len(stack_shape), values.ndim))
+        if values.shape[len(stack_shape):] != tuple(self.nodes_count):
+            raise ValueError(f"Values shape {values.shape} doesn't match grid nodes {self.nodes_count}.")
+        values = cast(values, self.data.dtype).reshape(-1, self.shape[1])
+        # sparse product with columns of values doesn't build temporary arrays of size nnz
+        result = np.asarray(self.matrix @ values.T).T
+        return result.reshape(stack_shape + self.points_shape)
+
+    def __matmul__(self, values):
+        return self.apply(values)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: shape={self.shape}, nnz={self.nnz}>"
+
+
+def _grid_locators(grid):
+    """ Functions which locate points in node index coordinates along each axis and counts of nodes. """
+    if isinstance(grid, (UniformGrid, RectilinearGrid)):
+        return [axis.locate for axis in grid], grid.shape
+    locators = [functools.partial(_uniform_locate, g.min(), g.max(), g.shape[i]) for i, g in enumerate(grid)]
+    return locators, grid[0].shape
+
+
+def _local_weights(x, bfunc, padding, locators, coefficients_count, orders):
+    """ Indexes of grid nodes near points and basis functions derivatives of these nodes for each order. """
+    indexes, weights = [], []
+    for i, locate in enumerate(locators):
+        # point position in node index coordinates
+        t, scale = locate(x[i])
+        t, scale = np.asarray(t, dtype=x.dtype), np.asarray(scale, dtype=x.dtype)
+        idx, shifts, outside = local_support(t + padding, bfunc.kernel.support, coefficients_count[i])
+
+        axis_weights = {}
+        for order in set(o[i] for o in orders):
+            w = bfunc.deriv(shifts, order) * np.reshape(scale, (-1, 1)) ** order if order else bfunc(shifts)
+            w[outside] = 0.
+            axis_weights[order] = w
+        indexes.append(idx)
+        weights.append(axis_weights)
+    return indexes, weights
+
+
+def _local_interpolation(x, values, bfunc, padding, locators, orders, stats=None, batch_size=None):
+    """ Computes interpolation using only grid nodes where basis functions are nonzero.
+
+    Coefficients 'values' may have 'padding' extra nodes on each side of the grid.
+    """
+    start = time.perf_counter() if stats is not None else None
+    indexes, weights = _local_weights(x, bfunc, padding, locators, values.shape, orders)
+    weights_end = time.perf_counter() if stats is not None else None
+    node_values = cast(tensor_gather(values, indexes), x.dtype)
+    gather_end = time.perf_counter() if stats is not None else None
+    result = [np.einsum('ij,ij->i', tensor_weights([w[o] for w, o in zip(weights, order)]), node_values)
+              for order in orders]
+    if stats is not None:
+        times = {
+            "weights": weights_end - start,
+            "gather": gather_end - weights_end,
+            "reduction": time.perf_counter() - gather_end,
+        }
+        nbytes = node_values.nbytes + sum(idx.nbytes for idx in indexes) + \
+            sum(w.nbytes for axis_weights in weights for w in axis_weights.values())
+        stats(BatchStats("interpolation", x.shape[1], times, nbytes, batch_size))
+    return result
+
+
+def _uniform_locate(start, end, count, x):
+    """ Positions of points in node index coordinates of uniform nodes and their derivatives by points. """
+    scale = (count - 1) / (end - start)
+    return (x - start) * scale, scale
+
+
+def _unit_orders(dim):
+    """ Orders of first partial derivatives for each variable. """
+    return [tuple(int(i == j) for j in range(dim)) for i in range(dim)]
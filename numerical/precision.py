@@ -0,0 +1,70 @@
+""" Library-wide floating point precision policy.
+
+Data type of grids arguments, quadrature rules, spline weights and interpolation
+coefficients is the default dtype unless a function gets its own 'dtype' argument.
+float32 halves memory traffic of large batches, while sums of many values
+(e.g. integrals of blocks of grid cells) are still accumulated in float64.
+
+Memory of batches is bounded by the limits below, which are shared by integration
+and interpolation.
+
+'set_dtype' changes the default of the whole process, while 'precision' overrides it
+only in the current thread, so concurrent integrations don't see each other's dtype.
+"""
+import contextlib
+import threading
+
+import numpy as np
+
+
+# memory of arrays of a batch of points (or of a block of cells) with automatic batch size
+DEFAULT_MEMORY_LIMIT = 2 ** 26
+# max count of points where function is evaluated at once
+MAX_BATCH_POINTS = 2 ** 21
+
+_default_dtype = np.dtype(np.float64)
+# data types set by 'precision' blocks of each thread
+_local = threading.local()
+
+
+def get_dtype():
+    """ Default floating point data type of the current thread. """
+    dtype = getattr(_local, "dtype", None)
+    return _default_dtype if dtype is None else dtype
+
+
+def set_dtype(dtype):
+    """ Sets default floating point data type of the process, e.g. numpy.float32. """
+    global _default_dtype
+    _default_dtype = _floating(dtype)
+
+
+@contextlib.contextmanager
+def precision(dtype):
+    """ Context manager which sets default floating point data type of the current thread inside 'with' block. """
+    previous = getattr(_local, "dtype", None)
+    _local.dtype = _floating(dtype)
+    try:
+        yield _local.dtype
+    finally:
+        _local.dtype = previous
+
+
+def resolve_dtype(dtype=None):
+    """ Data type of a call: 'dtype' if it is given or the default one. """
+    return get_dtype() if dtype is None else _floating(dtype)
+
+
+def cast(values, dtype):
+    """ Rounds values to precision of floating 'dtype', complex values stay complex. """
+    values = np.asarray(values)
+    if np.iscomplexobj(values):
+        dtype = np.result_type(dtype, np.complex64)
+    return values.astype(dtype, copy=False)
+
+
+def _floating(dtype):
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.floating):
+        raise ValueError(f"Data type must be floating point. {dtype} is not valid.")
+    return dtype
@@ -1,6 +1,7 @@
 from .definitions import (
     linear,
     schoenberg,
+    bspline,
 )
 
-__all__ = ['linear', 'schoenberg']
+__all__ = ['linear', 'schoenberg', 'bspline']
@@ -1,44 +1,69 @@
+from functools import lru_cache
+from math import factorial
+
 import numpy as np
-from numpy import power as Power
 
 from numerical import derivative
+from numerical.utils.combinatorics import comb
+from numerical.splines.piecewise import PiecewisePolynomial, kernel
 
 
-def linear(x: np.array) -> np.array:
+@derivative.setup(ftype="numerical")
+@kernel(PiecewisePolynomial(-1., [
+    [1., 1.],  # if x > -1 and x <= 0
+    [1., -1.],  # if x > 0 and x < 1
+]))
+def linear(x: np.array, out: np.array = None) -> np.array:
     """ One-dimensional linear spline.
 
     Spline defined on the interval (-1, 1).
     """
-    x = np.array(x, dtype=np.float64)
-    fx = np.zeros_like(x)
-    idx = np.logical_and(x > -1, x <= 0)
-    fx[idx] = x[idx] + 1
-    idx = np.logical_and(x > 0, x < 1)
-    fx[idx] = -x[idx] + 1
-    idx = np.logical_or(x <= -1, x >= 1)
-    fx[idx] = 0
-    return fx
+    return linear.kernel(x, out=out)
 
 
 @derivative.setup(ftype="numerical")
-def schoenberg(x: np.array) -> np.array:
+@kernel(PiecewisePolynomial(0., [
+    [0.55, 0., -1 / 2., 0., 1 / 4., -1 / 12.],  # if x >= 0 and x < 1
+    [0.425, 5 / 8., -7 / 4., 5 / 4., -3 / 8., 1 / 24.],  # if x >= 1 and x < 2
+    [2.025, -27 / 8., 9 / 4., -3 / 4., 1 / 8., -1 / 120.],  # if x >= 2 and x < 3
+]))
+def schoenberg(x: np.array, out: np.array = None) -> np.array:
     """ One-dimensional Schoenberg spline of 5-th order.
 
     Spline defined on the interval (0, 3)
     """
-    fx = np.zeros_like(x)
-    # if x >= 0 and x < 1
-    idx = np.logical_and(x >= 0., x < 1.)
-    fx[idx] = 0.55 - Power(x[idx], 2)/2. + Power(x[idx], 4)/4. - Power(x[idx], 5)/12.
-    # if x >= 1 and x < 2
-    idx = np.logical_and(x >= 1., x < 2.)
-    fx[idx] = 0.425 + (5*x[idx])/8. - (7*Power(x[idx], 2))/4. + (5*Power(x[idx], 3))/4. -\
-              (3*Power(x[idx], 4))/8. + Power(x[idx], 5)/24.
-    # if x >=2 and x < 3
-    idx = np.logical_and(x >= 2., x < 3.)
-    fx[idx] = 2.025 - (27*x[idx])/8. + (9*Power(x[idx], 2))/4. - (3*Power(x[idx], 3))/4. +\
-              Power(x[idx], 4)/8. - Power(x[idx], 5)/120.
-    # if x < 0 and x > 3
-    idx = np.logical_and(x < 0., x >= 3.)
-    fx[idx] = 0
-    return fx
+    return schoenberg.kernel(x, out=out)
+
+
+@lru_cache(maxsize=None)
+def bspline(degree: int):
+    """ Centered cardinal B-spline of given degree.
+
+    Spline defined on the interval (-(degree + 1) / 2, (degree + 1) / 2).
+    B-spline of degree 1 is the linear spline, and B-spline of degree 5
+    is the Schoenberg spline extended symmetrically to negative arguments.
+
+    Returns:
+        spline function.
+    """
+    if degree < 0:
+        raise ValueError(f"Degree of B-spline must be non-negative. {degree} < 0")
+    start = -(degree + 1) / 2.
+    # B(x) = sum((-1)^k * C(degree + 1, k) * (x - start - k)_+^degree) / degree!, k <= piece on the piece,
+    # where x - start - k = t + piece - k for local variable t of the piece.
+    # Sums of large terms with alternating signs are exact in int and rounded once.
+    coefficients = np.zeros((degree + 1, degree + 1))
+    for piece in range(degree + 1):
+        for power in range(degree + 1):
+            coefficients[piece, power] = sum((-1) ** k * comb(degree + 1, k) * comb(degree, power) *
+                                             (piece - k) ** (degree - power) for k in range(piece + 1)) / \
+                factorial(degree)
+
+    @derivative.setup(ftype="numerical")
+    @kernel(PiecewisePolynomial(start, coefficients, local=True))
+    def spline(x: np.array, out: np.array = None) -> np.array:
+        return spline.kernel(x, out=out)
+
+    spline.__name__ = spline.__qualname__ = f"bspline{degree}"
+    spline.__doc__ = f""" One-dimensional centered B-spline of {degree}-th degree. """
+    return spline
@@ -0,0 +1,118 @@
+import numpy as np
+
+from numerical.precision import get_dtype
+
+
+class PiecewisePolynomial:
+    """ Piecewise polynomial function on consecutive unit intervals.
+
+    Polynomial of i-th piece is defined on the interval [start + i, start + i + 1)
+    by coefficients[i] in ascending order of powers of x, or of powers of local
+    variable x - start - i if 'local'. Local coefficients of high degree don't lose
+    precision in cancellation of large terms. Function is zero outside of pieces.
+    """
+    def __init__(self, start: float, coefficients, local: bool = False):
+        self.start = start
+        self.local = local
+        self.coefficients = np.array(coefficients, dtype=np.float64)
+        if self.coefficients.ndim != 2:
+            raise ValueError("Coefficients table must be 2-dimensional (pieces count, degree + 1).")
+        self.coefficients.setflags(write=False)
+        self._derivatives = {0: self}
+        # columns are contiguous for fast gathering by piece index
+        self._columns = [np.ascontiguousarray(c) for c in self.coefficients.T]
+
+    @property
+    def pieces_count(self):
+        return self.coefficients.shape[0]
+
+    @property
+    def degree(self):
+        return self.coefficients.shape[1] - 1
+
+    @property
+    def support(self):
+        return self.start, self.start + self.pieces_count
+
+    def __call__(self, x: np.array, out: np.array = None) -> np.array:
+        """ Evaluates function with one piece lookup and Horner's scheme.
+
+        Args:
+            x: numpy.ndarray, points.
+            out: numpy.ndarray, optional output array with the same shape as 'x'.
+        Returns:
+            numpy.ndarray, function values with data type of floating 'x' or the default one.
+        """
+        x = np.asarray(x)
+        if out is None:
+            out = np.empty(x.shape, dtype=x.dtype if np.issubdtype(x.dtype, np.floating) else get_dtype())
+
+        piece = np.asarray(np.floor(x - self.start))
+        # comparisons with NaN are false, so NaN is outside of pieces
+        outside = ~np.logical_and(piece >= 0, piece < self.pieces_count)
+        piece[outside] = 0
+        if self.local:
+            x = (x - self.start - piece).astype(out.dtype, copy=False)
+        piece = piece.astype(np.intp)
+
+        coefficient = np.empty_like(out)
+        np.take(self._columns[-1], piece, out=out, mode='clip')
+        for column in reversed(self._columns[:-1]):
+            np.multiply(out, x, out=out)
+            np.add(out, np.take(column, piece, out=coefficient, mode='clip'), out=out)
+        out[outside] = 0.
+        return out
+
+    def derivative(self, order: int = 1):
+        """ Exact derivative of piecewise polynomial, computed once for each order.
+
+        Derivative at breaks between pieces is taken from the right piece.
+
+        Args:
+            order: int, order of derivative.
+        Returns:
+            PiecewisePolynomial
+        """
+        if order < 0:
+            raise ValueError(f"Order of derivative must be non-negative. {order} < 0")
+        if order not in self._derivatives:
+            previous = self.derivative(order - 1)
+            coefficients = previous.coefficients[:, 1:] * np.arange(1, previous.degree + 1)
+            if coefficients.shape[1] == 0:
+                coefficients = np.zeros((self.pieces_count, 1))
+            self._derivatives[order] = PiecewisePolynomial(self.start, coefficients, self.local)
+        return self._derivatives[order]
+
+    def integral(self, a, b):
+        """ Exact integral over intervals [a, b] with antiderivative of each piece.
+
+        Args:
+            a: float or numpy.ndarray, lower limits.
+            b: float or numpy.ndarray, upper limits with the same shape.
+        Returns:
+            numpy.ndarray of float64 integrals with shape of limits.
+        """
+        a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+        starts = self.start + np.arange(self.pieces_count).reshape((-1,) + (1,) * a.ndim)
+        lower, upper = np.clip(a, starts, starts + 1), np.clip(b, starts, starts + 1)
+        # antiderivative of piece is sum of c_k * x^(k + 1) / (k + 1)
+        antiderivatives = np.pad(self.coefficients / np.arange(1, self.degree + 2), ((0, 0), (1, 0)), mode="constant")
+        result = np.zeros(a.shape)
+        origins = starts if self.local else np.zeros_like(starts)
+        for antiderivative, piece_lower, piece_upper, origin in zip(antiderivatives, lower, upper, origins):
+            result += np.polynomial.polynomial.polyval(piece_upper - origin, antiderivative) - \
+                np.polynomial.polynomial.polyval(piece_lower - origin, antiderivative)
+        return result
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: " \
+            f"support={self.support}, " \
+            f"degree={self.degree}>"
+
+
+def kernel(polynomial: PiecewisePolynomial):
+    """ Decorator which attaches piecewise polynomial evaluated by function as its 'kernel' attribute. """
+    def decorator(f):
+        f.kernel = polynomial
+        return f
+    return decorator
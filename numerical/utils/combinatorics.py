@@ -0,0 +1,11 @@
+from math import factorial
+
+
+def comb(n: int, k: int) -> int:
+    """ Count of ways to choose k items from n items, zero if k < 0 or k > n.
+
+    Same as math.comb, which is available only since python 3.8.
+    """
+    if k < 0 or k > n:
+        return 0
+    return factorial(n) // (factorial(k) * factorial(n - k))
@@ -1,43 +1,62 @@
+import functools
+
 import numpy as np
-from numerical.utils.linalg import polar2cartesian
 
 
-def repeat_args(f_args, n_roots, cnt_reps):
-    """ Repeat arguments as cartesian product.
+def tensor_args(f_args):
+    """ Builds function arguments on cartesian product of cells and roots without repeating.
+
+    Args:
+        f_args: list of numpy.ndarray with shape (cells count, roots count), arguments for each dimension.
+    Returns:
+        numpy.ndarray with shape (dim, cells count 1, ..., cells count n, roots count 1, ..., roots count n).
+    """
+    dim = len(f_args)
+    shape = tuple(arg.shape[0] for arg in f_args) + tuple(arg.shape[1] for arg in f_args)
+    args = np.empty((dim,) + shape, dtype=np.result_type(*f_args))
+    for i, arg in enumerate(f_args):
+        arg_shape = [1] * (2 * dim)
+        arg_shape[i], arg_shape[dim + i] = arg.shape
+        # broadcasting assignment fills the argument without intermediate copies
+        args[i] = arg.reshape(arg_shape)
+    return args
+
+
+def cells_args(f_args):
+    """ Builds function arguments on cartesian product of roots for each cell separately.
 
     Args:
-        f_args: list of arguments for repeating.
-        n_roots: int, number of roots in gauss-legender quadrature.
-        cnt_reps: list of int, repeat count for each argument.
+        f_args: list of numpy.ndarray with shape (cells count, roots count), arguments for each dimension.
     Returns:
-        list of numpy.ndarray of repeated arguments' value.
+        numpy.ndarray with shape (dim, cells count, roots count 1, ..., roots count n).
+    """
+    dim = len(f_args)
+    cells_count = f_args[0].shape[0]
+    shape = (cells_count,) + tuple(arg.shape[1] for arg in f_args)
+    args = np.empty((dim,) + shape, dtype=np.result_type(*f_args))
+    for i, arg in enumerate(f_args):
+        arg_shape = [cells_count] + [1] * dim
+        arg_shape[i + 1] = arg.shape[1]
+        args[i] = arg.reshape(arg_shape)
+    return args
+
+
+def broadcast_values(f_val, points_shape):
+    """ Broadcasts function values to shape of points.
+
+    Constant functions may return values of smaller shape and vector-valued functions
+    return values with leading axes for their components, which are kept.
     """
-    if len(f_args) == 1:
-        return np.array(f_args)
-
-    elif len(f_args) == 2:
-        xx_rep = np.repeat(np.repeat(f_args[0], n_roots, axis=1), repeats=cnt_reps[1], axis=0)
-        yy_rep = np.tile(f_args[1], (cnt_reps[0], n_roots))
-        return np.array([xx_rep, yy_rep])
-
-    elif len(f_args) == 3:
-        xx_rep = np.repeat(np.repeat(f_args[0], n_roots * n_roots, axis=1), repeats=cnt_reps[1] * cnt_reps[2], axis=0)
-        yy_rep = np.repeat(np.tile(f_args[1], (cnt_reps[0], n_roots * n_roots)), repeats=cnt_reps[2], axis=0)
-        zz_rep = np.tile(f_args[2], (cnt_reps[0] * cnt_reps[1], n_roots * n_roots))
-        return np.array([xx_rep, yy_rep, zz_rep])
-
-    else:
-        raise ValueError("Repeating arguments for dims > 3 is not implemented.")
-
-
-def coordinate_transform(ndfunc, coords_type):
-    if coords_type == "cartesian":
-        return ndfunc
-    elif coords_type == "polar":
-        def ndfunc_t(x):
-            return ndfunc(polar2cartesian(x)) * x[0]
-        return ndfunc_t
-    elif coords_type == "spherical":
-        raise NotImplementedError("Spherical coordinates was not implemented.")
-    else:
-        raise ValueError("Coordinates type can be 'cartesian', 'polar' or 'spherical'.")
+    f_val = np.asarray(f_val)
+    # zero-strided view of points shape doesn't allocate memory
+    return np.broadcast_to(f_val, np.broadcast(f_val, np.broadcast_to(0., points_shape)).shape)
+
+
+def stack_functions(ndfuncs):
+    """ Joins list of functions into a single vector-valued function. """
+    # partial object is picklable unlike closure, so stacked function may be sent to other processes
+    return functools.partial(_stacked, tuple(ndfuncs))
+
+
+def _stacked(ndfuncs, x):
+    return np.stack([np.broadcast_to(f(x), x.shape[1:]) for f in ndfuncs])
@@ -1,36 +1,189 @@
 import numpy as np
 
+from numerical.utils.linalg import solve_banded
 
-def repeat_args(args, nodes_count):
-    """ Repeat arguments as cartesian product.
-
-        Args:
-            args: list of arguments for repeating.
-            nodes_count: tuple, nodes of grid
-        Returns:
-            numpy.ndarray of repeated arguments' value.
-        """
-    if len(args) == 1:
-        return args
-    elif len(args) == 2:
-        d1 = np.repeat(args[0], nodes_count[1], -1)
-        tile_dims = [1] * len(args[1].shape)
-        tile_dims[-1] = nodes_count[0]
-        d2 = np.tile(args[1], tuple(tile_dims))
-        dd1 = np.expand_dims(d1, -1)
-        dd2 = np.expand_dims(d2, -1)
-        return np.rollaxis(np.concatenate([dd1, dd2], -1), -1, 0)
-    elif len(args) == 3:
-        d1 = np.repeat(args[0], (nodes_count[1]) * (nodes_count[2]), axis=-1)
-        tile_dims = [1] * len(args[1].shape)
-        tile_dims[-1] = nodes_count[0]
-        d2 = np.repeat(np.tile(args[1], tuple(tile_dims)), nodes_count[2], axis=-1)
-        tile_dims = [1] * len(d2.shape)
-        tile_dims[-1] = (nodes_count[0]) * (nodes_count[1])
-        d3 = np.tile(args[2], tuple(tile_dims))
-        dd1 = np.expand_dims(d1, -1)
-        dd2 = np.expand_dims(d2, -1)
-        dd3 = np.expand_dims(d3, -1)
-        return np.rollaxis(np.concatenate([dd1, dd2, dd3], -1), -1, 0)
-    else:
-        raise ValueError("Repeat arguments are not implemented for dim > 3")
+
+def local_support(t, support, count):
+    """ Indexes of grid nodes which influence points.
+
+    Basis function is nonzero only on the open interval 'support',
+    so each point is influenced by (support[1] - support[0]) neighboring nodes.
+
+    Args:
+        t: numpy.ndarray, 1-d array of points in node index coordinates.
+        support: tuple, (left, right) bounds of basis function support.
+        count: int, count of grid nodes.
+    Returns:
+        tuple of numpy.ndarray (indexes, shifts, outside) with shape (len(t), support[1] - support[0]),
+        where shifts are basis function arguments and outside is a mask of nodes outside the grid.
+    """
+    width = int(np.ceil(support[1] - support[0]))
+    # far away points are moved to the nearest position where all nodes are outside the grid
+    first = np.clip(np.nan_to_num(np.floor(t - support[1]) + 1), -width, count).astype(np.intp)
+    indexes = first.reshape(-1, 1) + np.arange(width)
+    shifts = t.reshape(-1, 1) - indexes
+    # nodes outside the grid don't contribute to interpolation
+    outside = np.logical_or(indexes < 0, indexes >= count)
+    indexes[outside] = 0
+    return indexes, shifts, outside
+
+
+def prefilter_width(bfunc):
+    """ Count of coefficients which prefilter appends on each side of each axis. """
+    return int(np.ceil(bfunc.kernel.support[1])) - 1
+
+
+def prefilter(values, bfunc, axes=None):
+    """ Computes coefficients of basis functions which interpolate values in grid nodes.
+
+    Interpolation conditions are solved separately along each axis of the grid
+    with banded matrix. Boundary conditions are not-a-knot: the highest derivative
+    of spline is continuous at the first and the last 'padding' knots, so spline
+    converges with its full order up to the grid boundary. Equivalently, coefficients
+    outside the grid are extrapolated with the polynomial through the first (last)
+    degree + 1 coefficients inside, see 'prefilter_extrapolation'. These outside
+    coefficients are appended to the result, so it has 'padding' more nodes on each
+    side of each axis.
+
+    Args:
+        values: numpy.ndarray, function values in grid nodes.
+        bfunc: symmetric spline function with piecewise polynomial kernel.
+        axes: iterable of int, axes of grid in values, all axes if None.
+    Returns:
+        tuple (coefficients, padding), numpy.ndarray of coefficients of basis functions in padded grid nodes
+        and int count of nodes appended on each side.
+    """
+    width = prefilter_width(bfunc)
+    extrapolation = prefilter_extrapolation(bfunc)
+    coefficients = np.asarray(values, dtype=np.result_type(values, np.float64))
+    for axis in range(coefficients.ndim) if axes is None else axes:
+        count = coefficients.shape[axis]
+        bands = prefilter_bands(count, bfunc)
+        axis_values = np.moveaxis(coefficients, axis, 0)
+        solution = solve_banded(bands, axis_values.reshape(count, -1)).reshape(axis_values.shape)
+        stencil = extrapolation.shape[1]
+        padded = np.concatenate([np.tensordot(extrapolation[::-1], solution[:stencil], axes=1),
+                                 solution,
+                                 np.tensordot(extrapolation, solution[::-1][:stencil], axes=1)])
+        coefficients = np.moveaxis(padded, 0, axis)
+    return coefficients, width
+
+
+def prefilter_extrapolation(bfunc):
+    """ Weights of coefficients outside the grid in terms of the nearest coefficients inside.
+
+    Not-a-knot conditions make coefficients c[-width], ..., c[degree] values of one polynomial
+    of spline degree, so outside coefficient c[-m] = sum of E[m - 1, q] * c[q], q = 0, ..., degree,
+    where E are Lagrange basis polynomials of nodes 0, ..., degree at -m. The same weights
+    apply at the other side of the grid with reversed coefficients.
+
+    Args:
+        bfunc: symmetric spline function with piecewise polynomial kernel.
+    Returns:
+        numpy.ndarray E with shape (padding, degree + 1).
+    """
+    width = prefilter_width(bfunc)
+    nodes = np.arange(bfunc.kernel.degree + 1)
+    extrapolation = np.ones((width, len(nodes)))
+    for q in nodes:
+        for r in nodes[nodes != q]:
+            extrapolation[:, q] *= (-np.arange(1, width + 1) - r) / (q - r)
+    return extrapolation
+
+
+def prefilter_bands(count, bfunc):
+    """ Banded matrix of interpolation conditions along an axis with extrapolated outside coefficients.
+
+    Args:
+        count: int, count of grid nodes along axis.
+        bfunc: symmetric spline function with piecewise polynomial kernel.
+    Returns:
+        numpy.ndarray with shape (count, 2 * degree + 1), see 'solve_banded', as the first
+        and the last rows have extrapolation weights up to spline degree from the diagonal.
+    """
+    width = prefilter_width(bfunc)
+    extrapolation = prefilter_extrapolation(bfunc)
+    stencil = extrapolation.shape[1]
+    if count < max(stencil, width + 1):
+        raise ValueError(f"Grid must have at least {max(stencil, width + 1)} nodes along each axis for this "
+                         f"basis. Axis has {count} nodes.")
+    half_width = stencil - 1
+    shifts = np.arange(-width, width + 1)
+    basis_values = bfunc(shifts.astype(np.float64))
+
+    # row i contains basis values of nodes i - width, ..., i + width
+    rows = np.repeat(np.arange(count), len(shifts))
+    shift = np.tile(shifts, count)
+    basis_value = np.tile(basis_values, count)
+    nodes = rows + shift
+    left, right = nodes < 0, nodes >= count
+    inside = ~(left | right)
+
+    bands = np.zeros((count, 2 * half_width + 1))
+    np.add.at(bands, (rows[inside], half_width + shift[inside]), basis_value[inside])
+    # outside nodes are replaced by extrapolation from the first (last) nodes inside
+    q = np.arange(stencil)
+    for side, columns in ((left, q), (right, count - 1 - q)):
+        side_rows = rows[side].reshape(-1, 1)
+        distance = np.where(nodes[side] < 0, -nodes[side], nodes[side] - count + 1)
+        weights = basis_value[side].reshape(-1, 1) * extrapolation[distance - 1]
+        np.add.at(bands, (np.broadcast_to(side_rows, weights.shape), half_width + columns - side_rows), weights)
+    return bands
+
+
+def tensor_indexes(indexes, nodes_count):
+    """ Combines one-dimensional node indexes into indexes of the raveled grid.
+
+    Args:
+        indexes: list of numpy.ndarray with shape (points count, support width), nodes indexes for each dimension.
+        nodes_count: tuple, nodes of grid
+    Returns:
+        numpy.ndarray with shape (points count, product of support widths).
+    """
+    flat_indexes = indexes[0]
+    for idx, count in zip(indexes[1:], nodes_count[1:]):
+        points_count = len(flat_indexes)
+        flat_indexes = (np.expand_dims(flat_indexes, -1) * count + np.expand_dims(idx, 1)).reshape(points_count, -1)
+    return flat_indexes
+
+
+def tensor_gather(values, indexes):
+    """ Values of grid nodes in tensor products of one-dimensional node indexes.
+
+    Memory-mapped values are read once for each distinct node in the order of the file,
+    so only pages of the file around points are touched.
+
+    Args:
+        values: numpy.ndarray, values in grid nodes.
+        indexes: list of numpy.ndarray with shape (points count, support width), nodes indexes for each dimension.
+    Returns:
+        numpy.ndarray with shape (points count, product of support widths).
+    """
+    points_count = len(indexes[0])
+    if isinstance(values, np.memmap):
+        flat_indexes, inverse = np.unique(tensor_indexes(indexes, values.shape), return_inverse=True)
+        node_values = np.asarray(values[np.unravel_index(flat_indexes, values.shape)])
+        return node_values[inverse].reshape(points_count, -1)
+
+    if values.flags.c_contiguous:
+        return values.reshape(-1)[tensor_indexes(indexes, values.shape)]
+    dim = len(indexes)
+    # index of i-th dimension varies along axis i + 1, as in tensor_indexes
+    nd_indexes = tuple(idx.reshape((points_count,) + (1,) * i + (-1,) + (1,) * (dim - i - 1))
+                       for i, idx in enumerate(indexes))
+    return values[nd_indexes].reshape(points_count, -1)
+
+
+def tensor_weights(weights):
+    """ Combines one-dimensional basis values into their tensor product.
+
+    Args:
+        weights: list of numpy.ndarray with shape (points count, support width), basis values for each dimension.
+    Returns:
+        numpy.ndarray with shape (points count, product of support widths).
+    """
+    nd_weights = weights[0]
+    for w in weights[1:]:
+        points_count = len(nd_weights)
+        nd_weights = (np.expand_dims(nd_weights, -1) * np.expand_dims(w, 1)).reshape(points_count, -1)
+    return nd_weights
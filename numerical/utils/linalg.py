@@ -1,4 +1,5 @@
 import numpy as np
+import scipy.linalg
 
 
 def multi_dot(*vectors):
@@ -15,20 +16,61 @@ def multi_dot(*vectors):
     return multi_dot(vec_dot, *vectors[2:])
 
 
-def multi_dot2(*vectors, flatten=False, reshape=False):
-    md = multi_dot(*vectors)
-    if flatten:
-        md = md.ravel()
-    if reshape:
-        md = md.reshape(-1, 1)
-    return md
+def contract(values, *vectors):
+    """ Contracts trailing axes of array with vectors.
 
+    The last vector is contracted with the last axis, the previous vector
+    with the axis before it and so on. Leading axes of 'values' which are
+    not matched by vectors are kept.
+
+    Args:
+        values: numpy.ndarray with len(shape) >= len(vectors)
+        vectors: tuple of numpy.array with len(shape) = 1
+    Returns:
+        numpy.ndarray
+    """
+    for vec in reversed(vectors):
+        values = np.matmul(values, vec)
+    return values
 
-def polar2cartesian(x):
-    """ Transform polar coordinates to cartesian.
 
-    Coordinates order:
-        x[0] ~ ro
-        x[1] ~ phi
+def solve_banded(bands, rhs):
+    """ Solves linear system with banded matrix by LU decomposition with partial pivoting.
+
+    Args:
+        bands: numpy.ndarray with shape (n, 2 * w + 1), where bands[i, k] is the matrix
+            element in row i and column i + k - w, w is a half bandwidth.
+        rhs: numpy.ndarray with shape (n, ...), right-hand sides.
+    Returns:
+        numpy.ndarray with shape of 'rhs', solutions.
+    """
+    n = bands.shape[0]
+    width = bands.shape[1] // 2
+    # LAPACK layout keeps element (i, j) in row width + i - j and column j
+    lapack_bands = np.zeros((2 * width + 1, n))
+    for k in range(2 * width + 1):
+        shift = k - width
+        rows = np.arange(max(0, -shift), min(n, n - shift))
+        lapack_bands[width - shift, rows + shift] = bands[rows, k]
+    rhs = np.asarray(rhs)
+    solution = scipy.linalg.solve_banded((width, width), lapack_bands, rhs.reshape(n, -1))
+    return solution.reshape(rhs.shape)
+
+
+def transpose_bands(bands):
+    """ Bands of transposed banded matrix.
+
+    Args:
+        bands: numpy.ndarray with shape (n, 2 * w + 1), see 'solve_banded'.
+    Returns:
+        numpy.ndarray with the same shape, bands of transposed matrix.
     """
-    return np.array([x[0] * np.cos(x[1]), x[0] * np.sin(x[1])], dtype=np.float64)
+    n = bands.shape[0]
+    width = bands.shape[1] // 2
+    transposed = np.zeros_like(bands)
+    for k in range(bands.shape[1]):
+        # element (i, i + shift) of matrix is element (i + shift, i) of transposed matrix
+        shift = k - width
+        rows = np.arange(max(0, -shift), min(n, n - shift))
+        transposed[rows + shift, 2 * width - k] = bands[rows, k]
+    return transposed
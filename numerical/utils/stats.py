@@ -0,0 +1,49 @@
+""" Opt-in statistics of batches of integration and interpolation.
+
+Functions which accept 'stats' argument call it with BatchStats after each
+batch of points. Any callable may be used as a hook, Stats collects batches
+and summarizes them. Nothing is measured if 'stats' is None.
+"""
+from collections import namedtuple
+
+
+# times is a dict {stage name: seconds}, nbytes is a size of arrays allocated for the batch,
+# batch_size is the batch size chosen for the call: int count of points or tuple of cells counts of a block
+BatchStats = namedtuple("BatchStats", ["kind", "points", "times", "nbytes", "batch_size"])
+
+
+class Stats:
+    """ Collector of batches statistics with structured summary. """
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, batch: BatchStats):
+        self.batches.append(batch)
+
+    @property
+    def evaluations(self):
+        """ Count of points evaluated in all batches. """
+        return sum(batch.points for batch in self.batches)
+
+    def reset(self):
+        self.batches = []
+
+    def summary(self):
+        """ Totals of batches as a dict which may be serialized to JSON. """
+        times = {}
+        for batch in self.batches:
+            for stage, seconds in batch.times.items():
+                times[stage] = times.get(stage, 0.) + seconds
+        return {
+            "batches": len(self.batches),
+            "evaluations": self.evaluations,
+            "max_batch_points": max((batch.points for batch in self.batches), default=0),
+            "bytes": sum(batch.nbytes for batch in self.batches),
+            "max_batch_bytes": max((batch.nbytes for batch in self.batches), default=0),
+            "batch_size": self.batches[-1].batch_size if self.batches else None,
+            "times": times,
+            "total_time": sum(times.values()),
+        }
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: batches={len(self.batches)}, evaluations={self.evaluations}>"
@@ -0,0 +1,27 @@
+import numpy as np
+
+
+class CompensatedSum:
+    """ Running sum with Neumaier compensation of rounding errors.
+
+    Summands may be numbers or numpy arrays of the same shape.
+    """
+    def __init__(self, value=0.):
+        self._sum = value
+        self._compensation = 0.
+
+    def add(self, value):
+        total = self._sum + value
+        # lost low-order bits of the smaller summand are kept in compensation
+        self._compensation = self._compensation + np.where(np.abs(self._sum) >= np.abs(value),
+                                                           (self._sum - total) + value,
+                                                           (value - total) + self._sum)
+        self._sum = total
+        return self
+
+    @property
+    def value(self):
+        return self._sum + self._compensation
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: value={self.value}>"
@@ -0,0 +1,128 @@
+import tempfile
+import unittest
+import numpy as np
+
+from numerical import interpolate, ResultCache, Stats
+from numerical.integration import gauss
+
+
+SCALE = 1.
+
+
+def scaled(x):
+    return SCALE * x[0]
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def test_integration_cache(self):
+        def f(x):
+            return np.power(x[0], 2) + 2 * x[1] + 5
+
+        cache, stats = ResultCache(), Stats()
+        first = gauss.integrate(f, 0, 1, 0, 2 * np.pi, steps=(0.1, np.pi / 8), cache=cache, stats=stats)
+        evaluations = stats.evaluations
+        second = gauss.integrate(f, 0, 1, 0, 2 * np.pi, steps=(0.1, np.pi / 8), cache=cache, batch_size=(4, 4),
+                                 stats=stats)
+        self.assertTrue(np.allclose(first, [72.9887]))
+        self.assertTrue(np.array_equal(first, second))
+        self.assertEqual(stats.evaluations, evaluations)
+        self.assertEqual(cache.info().hits, 1)
+
+        # the same area given by grid object hits the cache, other quadrature doesn't
+        grid = gauss.grid.UniformGrid((0, 1, 0, 2 * np.pi), (0.1, np.pi / 8))
+        gauss.integrate(f, ndgrid=grid, cache=cache)
+        gauss.integrate(f, ndgrid=grid, roots_count=8, cache=cache)
+        self.assertEqual(cache.info()[:2], (2, 2))
+
+        # functions with different captured values have different keys
+        def g(power):
+            return lambda x: np.power(x[0], power)
+
+        self.assertNotEqual(cache.key(g(2)), cache.key(g(3)))
+        self.assertEqual(cache.key(g(2)), cache.key(g(2)))
+        self.assertTrue(np.allclose(gauss.integrate(g(2), 0, 1, cache=cache), 1. / 3.))
+        self.assertTrue(np.allclose(gauss.integrate(g(3), 0, 1, cache=cache), 1. / 4.))
+        self.assertTrue(np.allclose(gauss.integrate(g(3), 0, 1, cache=cache, cache_key="cube"), 1. / 4.))
+
+        cache.invalidate()
+        self.assertEqual(cache.info().entries, 0)
+        gauss.integrate(f, ndgrid=grid, cache=cache, stats=stats)
+        self.assertTrue(stats.evaluations > evaluations)
+
+    def test_method_and_object_keys(self):
+        class Model:
+            def __init__(self, power):
+                self.power = power
+
+            def f(self, x):
+                return np.power(x[0], self.power)
+
+            __call__ = f
+
+        cache = ResultCache()
+        # bound methods of different instances share code, but not keys
+        self.assertNotEqual(cache.key(Model(2).f), cache.key(Model(3).f))
+        self.assertEqual(cache.key(Model(2).f), cache.key(Model(2).f))
+        self.assertTrue(np.allclose(gauss.integrate(Model(2).f, 0, 1, cache=cache), 1. / 3.))
+        self.assertTrue(np.allclose(gauss.integrate(Model(3).f, 0, 1, cache=cache), 1. / 4.))
+
+        # callable object is hashed by its attributes, not by address, which is reused by the next object
+        self.assertTrue(np.allclose(gauss.integrate(Model(3), 0, 1, cache=cache), 1. / 4.))
+        self.assertTrue(np.allclose(gauss.integrate(Model(5), 0, 1, cache=cache), 1. / 6.))
+        self.assertEqual(cache.key(Model(5)), cache.key(Model(5)))
+        self.assertNotEqual(cache.key(Model(3)), cache.key(Model(3).f))
+
+        with self.assertRaises(ValueError):
+            cache.key(object())
+
+    def test_global_values_and_read_only_results(self):
+        global SCALE
+        cache = ResultCache()
+        self.assertTrue(np.allclose(gauss.integrate(scaled, 0, 1, cache=cache), 0.5))
+        # changed global value is a part of function key
+        SCALE = 5.
+        try:
+            self.assertTrue(np.allclose(gauss.integrate(scaled, 0, 1, cache=cache), 2.5))
+        finally:
+            SCALE = 1.
+        self.assertEqual(cache.info()[:2], (0, 2))
+
+        # result returned by each hit can't be modified
+        vector = gauss.integrate(lambda x: np.array([np.ones_like(x[0]), x[0]]), 0, 1, cache=cache)
+        with self.assertRaises(ValueError):
+            vector[0] = 99.
+        self.assertTrue(np.allclose(gauss.integrate(lambda x: np.array([np.ones_like(x[0]), x[0]]), 0, 1,
+                                                    cache=cache), [1., 0.5]))
+
+    def test_eviction_and_disk_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(max_bytes=2 * 800, directory=directory)
+            for i in range(3):
+                cache.put(cache.key(i), np.full(100, i, dtype=np.float64))
+            info = cache.info()
+            self.assertEqual((info.entries, info.evictions, info.bytes), (2, 1, 1600))
+
+            # evicted result is loaded from disk
+            self.assertTrue(np.array_equal(cache.get(cache.key(0)), np.zeros(100)))
+            self.assertEqual(cache.info().disk_hits, 1)
+            self.assertTrue(np.array_equal(ResultCache(directory=directory).get(cache.key(2)), np.full(100, 2.)))
+
+            cache.invalidate(cache.key(2))
+            self.assertIsNone(cache.get(cache.key(2)))
+            self.assertIsNone(ResultCache(directory=directory).get(cache.key(2)))
+
+    def test_interpolation_cache(self):
+        meshgrid = np.meshgrid(np.linspace(0, 1, 21), np.linspace(0, 1, 11), indexing='ij')
+        values = np.sin(3 * meshgrid[0]) * np.exp(meshgrid[1])
+        x = np.random.RandomState(0).rand(2, 20)
+
+        cache = ResultCache()
+        expected = interpolate(values, meshgrid, kind="cubic")(x)
+        self.assertTrue(np.allclose(interpolate(values, meshgrid, kind="cubic", cache=cache)(x), expected))
+        self.assertTrue(np.allclose(interpolate(values.copy(), meshgrid, kind="cubic", cache=cache)(x), expected))
+        self.assertEqual(cache.info()[:2], (1, 1))
+
+        interpolate(values + 1., meshgrid, kind="cubic", cache=cache)
+        interpolate(values, meshgrid, kind="schoenberg", cache=cache)
+        self.assertEqual(cache.info()[:2], (1, 3))
@@ -18,3 +18,49 @@ class GridTest(unittest.TestCase):
         true_nodes = np.append(true_nodes, 1.25)
         self.assertTrue(np.allclose(test_nodes, true_nodes))
 
+    def test_lazy_uniform_grid(self):
+        gd = grid.UniformGrid((0.0, 1.0, -0.74, 1.25, 0., 0.3), (0.05, 0.026, 0.1))
+        for axis in gd:
+            self.assertIsNone(axis._nodes)
+            self.assertFalse(hasattr(axis, "__dict__"))
+        self.assertEqual(gd.shape, (21, 78, 4))
+        self.assertEqual(gd.shape, tuple(len(axis.nodes) for axis in gd))
+        self.assertEqual(gd[2].diff.shape, (3,))
+
+        mesh = gd.meshgrid(indexing="ij", sparse=True)
+        self.assertEqual([m.shape for m in mesh], [(21, 1, 1), (1, 78, 1), (1, 1, 4)])
+        self.assertEqual(gd.mesh[0].shape, (78, 21, 4))
+
+        gd.steps = (0.5, 0.5, 0.075)
+        self.assertEqual(gd.shape, (3, 5, 5))
+
+    def test_uniform_grid_blocks(self):
+        gd = grid.UniformGrid((0.0, 1.0, 0.0, 2.0), (0.1, 0.5))
+        blocks = list(gd.iter_cells((4, 3)))
+        self.assertEqual(len(blocks), 6)
+        self.assertEqual(blocks[-1], (slice(8, 12), slice(3, 6)))
+
+        nodes = list(gd.iter_nodes((4, 3)))
+        self.assertEqual(len(nodes), 6)
+        self.assertEqual(sum(block[0].size for block in nodes), 11 * 5)
+        self.assertTrue(np.allclose(nodes[0][:, 1, 2], [0.1, 1.0]))
+
+    def test_rectilinear_grid(self):
+        gd = grid.RectilinearGrid([0., 0.01, 0.1, 0.5, 1.], [-1., 0., 2.])
+        self.assertEqual(gd.shape, (5, 3))
+        self.assertTrue(np.allclose(gd.bounds, [[0., 1.], [-1., 2.]]))
+        self.assertTrue(np.allclose(gd[0].diff, [0.005, 0.045, 0.2, 0.25]))
+        self.assertEqual(len(list(gd.iter_cells((2, 2)))), 2)
+
+        x = np.array([-0.5, 0., 0.005, 0.3, 1., 1.5])
+        self.assertTrue(np.array_equal(gd[0].cell_index(x), [0, 0, 0, 2, 3, 3]))
+        positions, scales = gd[0].locate(x)
+        self.assertTrue(np.allclose(positions, [-50., 0., 0.5, 2.5, 4., 5.]))
+        self.assertTrue(np.allclose(scales, [100., 100., 100., 2.5, 2., 2.]))
+
+        uniform = grid.UniformGrid((0., 1.), (0.3,))
+        positions, scales = uniform[0].locate(np.array([0.15, 0.95, 2.]))
+        self.assertTrue(np.allclose(positions, [0.5, 3.5, 4 + 1. / 0.1]))
+
+        with self.assertRaises(ValueError):
+            grid.RectilinearGrid([0., 1., 0.5])
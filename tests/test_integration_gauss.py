@@ -1,8 +1,34 @@
+import asyncio
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
+from numerical import Stats
+from numerical.coordinates import CoordinateTransform
 from numerical.integration import gauss
-from numerical.area.grid import UniformGrid
+from numerical.area.grid import UniformGrid, RectilinearGrid
+
+
+def polynomial(x):
+    return np.power(x[0], 2) + 2 * x[1] + 5
+
+
+def polar_to_cartesian(x):
+    return np.array([x[0] * np.cos(x[1]), x[0] * np.sin(x[1])])
+
+
+def polar_jacobian(x):
+    return x[0]
+
+
+def run(coroutine):
+    # asyncio.run isn't available on Python 3.6
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
 
 
 class GaussIntegrationTest(unittest.TestCase):
@@ -33,6 +59,160 @@ class GaussIntegrationTest(unittest.TestCase):
                 gauss.integrate(f, -1, 1.5, -0.2, 0.5, 0, 1.8, steps=(0.05, 0.05, 0.1), roots_count=16, batch_size=(32, 32, 32)), [5.77375], atol=1e-4, rtol=1e-4)
         )
 
+    def test_3d_anisotropic_integration(self):
+        def f(x):
+            return x[0] * np.power(x[1], 2) * np.power(x[2], 3)
+
+        self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, 0, 2, 0, 3, steps=(0.25, 0.5, 1.), roots_count=4), [27.]))
+        self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, 0, 2, 0, 3, steps=(0.25, 0.5, 1.), roots_count=4,
+                                                    batch_size=(3, 1, 2)), [27.]))
+
+    def test_4d_integration(self):
+        def f(x):
+            return x[0] * x[1] * np.power(x[2], 2) + x[3]
+
+        self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, 0, 1, 0, 3, 0, 2, steps=(0.5, 0.5, 1., 1.),
+                                                    roots_count=2), [4.5 + 6.]))
+
+    def test_rectilinear_integration(self):
+        def f(x):
+            return np.sqrt(x[0]) * x[1]
+
+        grid = RectilinearGrid(np.power(np.linspace(0, 1, 17), 4), [0., 0.5, 2.])
+        self.assertTrue(np.allclose(gauss.integrate(f, ndgrid=grid, roots_count=8, batch_size=(5, 1)), [4. / 3.]))
+
+    def test_curvilinear_integration(self):
+        def f(x):
+            return np.power(x[0], 2) + np.power(x[1], 2) + x[2]
+
+        # ball of radius 1 and cylinder of radius 1 and height 2
+        self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, 0, np.pi, 0, 2 * np.pi, steps=(0.5, np.pi / 4, np.pi / 2),
+                                                    roots_count=8, coords_type="spherical"), [8 * np.pi / 15]))
+        self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, 0, 2 * np.pi, 0, 2, steps=(0.5, np.pi / 4, 1.),
+                                                    roots_count=8, coords_type="cylindrical"), [np.pi + 2 * np.pi]))
+
+        transform = CoordinateTransform(polar_to_cartesian, polar_jacobian)
+        expected = gauss.integrate(polynomial, 0, 1, 0, np.pi, steps=(0.1, np.pi / 10), coords_type="polar")
+        self.assertTrue(np.allclose(gauss.integrate(polynomial, 0, 1, 0, np.pi, steps=(0.1, np.pi / 10),
+                                                    coords_type=transform, executor="process", workers=2), expected))
+        self.assertTrue(np.allclose(gauss.integrate_adaptive(polynomial, 0, 1, 0, np.pi, coords_type=transform).integral,
+                                    expected))
+        with self.assertRaises(ValueError):
+            gauss.integrate(polynomial, 0, 1, 0, np.pi, coords_type="spherical")
+
+    def test_integration_stats(self):
+        stats = Stats()
+        integral = gauss.integrate(polynomial, 0, 1, 0, 2, steps=(0.1, 0.5), roots_count=4, batch_size=(4, 4),
+                                   stats=stats, executor="thread", workers=2)
+        self.assertTrue(np.allclose(integral, 1. / 3. * 2 + 4 + 10))
+        summary = stats.summary()
+        self.assertEqual(summary["batches"], 3)
+        self.assertEqual(summary["evaluations"], 10 * 4 * 16)
+        self.assertEqual(summary["max_batch_points"], 4 * 4 * 16)
+        self.assertEqual(set(summary["times"]), {"arguments", "function", "reduction"})
+        self.assertTrue(summary["bytes"] > 0)
+
+    def test_auto_batch_size(self):
+        grid = UniformGrid((0, 1, 0, 2 * np.pi), (0.02, np.pi / 8))
+        # 16 roots in 2 dimensions take 256 points of 32 bytes in a cell
+        self.assertEqual(gauss.plan_batch_size(grid, roots_count=16, memory_limit=2 ** 16), (2, 4))
+        self.assertEqual(gauss.plan_batch_size(grid, roots_count=16), (50, 16))
+
+        partials = list(gauss.integrate_iter(polynomial, ndgrid=grid, roots_count=16, memory_limit=2 ** 16))
+        self.assertEqual(partials[-1].batch_size, (2, 4))
+        self.assertEqual(partials[-1].blocks_count, 25 * 4)
+        self.assertTrue(np.allclose(partials[-1].integral, [72.9887]))
+
+        # point of 7 function values takes 128 bytes of arguments, values and their products with weights
+        self.assertEqual(gauss.plan_batch_size(grid, roots_count=16, memory_limit=2 ** 16, values_size=7), (1, 2))
+
+        def vector_polynomial(x):
+            return np.array([polynomial(x) + k for k in range(7)])
+
+        partials = list(gauss.integrate_iter(vector_polynomial, ndgrid=grid, roots_count=16, memory_limit=2 ** 16))
+        self.assertEqual(partials[-1].batch_size, (1, 2))
+        self.assertTrue(np.allclose(partials[-1].integral, 72.9887 + 2 * np.pi * np.arange(7)))
+        cells = gauss.integrate_cells(vector_polynomial, ndgrid=grid, roots_count=16, memory_limit=2 ** 16)
+        self.assertEqual(cells.shape, (7, 50, 16))
+
+        # chosen batch size is reported to stats hook
+        stats = Stats()
+        gauss.integrate(polynomial, ndgrid=grid, roots_count=16, memory_limit=2 ** 16, stats=stats)
+        gauss.integrate_cells(polynomial, ndgrid=grid, roots_count=16, memory_limit=2 ** 16, stats=stats)
+        run(gauss.integrate_async(polynomial, ndgrid=grid, roots_count=16, memory_limit=2 ** 16, stats=stats))
+        self.assertEqual({batch.batch_size for batch in stats.batches}, {(2, 4)})
+        self.assertEqual(stats.summary()["batch_size"], (2, 4))
+
+        partials = list(gauss.integrate_iter(polynomial, ndgrid=grid, roots_count=16, batch_size="auto",
+                                             memory_limit=2 ** 18, probe=True))
+        self.assertTrue(np.prod(partials[-1].batch_size) <= 7 * 4)
+        self.assertTrue(np.allclose(partials[-1].integral, [72.9887]))
+        self.assertTrue(np.allclose(gauss.integrate(polynomial, 0, 1, 0, 2 * np.pi, steps=(0.02, np.pi / 8),
+                                                    batch_size="auto"), [72.9887]))
+        with self.assertRaises(ValueError):
+            gauss.integrate(polynomial, 0, 1, batch_size="large")
+
+    def test_empty_grid(self):
+        empty = UniformGrid((0., 0.), (0.1,))
+        with self.assertRaises(ValueError):
+            gauss.integrate(polynomial, ndgrid=empty)
+        with self.assertRaises(ValueError):
+            gauss.integrate_cells(polynomial, ndgrid=empty)
+        with self.assertRaises(ValueError):
+            gauss.integrate_adaptive(polynomial, ndgrid=empty)
+        with self.assertRaises(ValueError):
+            run(gauss.integrate_async(polynomial, ndgrid=empty))
+
+    def test_cells_integration(self):
+        grid = UniformGrid((0, 1, 0, 2 * np.pi), (0.02, np.pi / 8))
+        cells = gauss.integrate_cells(polynomial, ndgrid=grid, roots_count=4, batch_size=(16, 4), workers=2)
+        self.assertEqual(cells.shape, (50, 16))
+        self.assertTrue(np.allclose(cells.sum(), [72.9887]))
+        cell_integral = gauss.integrate(polynomial, 0.06, 0.08, 5 * np.pi / 8, 6 * np.pi / 8, roots_count=4)
+        self.assertTrue(np.allclose(cells[3, 5], cell_integral))
+
+        stats = Stats()
+        cells = gauss.integrate_cells(lambda x: np.array([x[0], np.ones_like(x[0])]), 0, 1, 0, 2, steps=(0.5, 0.5),
+                                      roots_count=4, coords_type="polar", stats=stats, dtype=np.float32)
+        self.assertEqual(cells.shape, (2, 2, 4))
+        self.assertEqual(cells.dtype, np.float32)
+        self.assertEqual(stats.evaluations, 8 * 16)
+        self.assertTrue(np.allclose(cells.sum(axis=(1, 2)), [np.sin(2) / 3., 1.]))
+
+    def test_async_integration(self):
+        in_flight = [0]
+        max_in_flight = []
+        delays = iter(np.random.RandomState(0).rand(100) * 0.01)
+
+        async def remote_polynomial(x):
+            in_flight[0] += 1
+            max_in_flight.append(in_flight[0])
+            await asyncio.sleep(next(delays))
+            in_flight[0] -= 1
+            return polynomial(x)
+
+        stats = Stats()
+        integral = run(gauss.integrate_async(remote_polynomial, 0, 1, 0, 2 * np.pi, steps=(0.02, np.pi / 8),
+                                             roots_count=16, batch_size=(16, 4), concurrency=3, stats=stats))
+        self.assertEqual(integral, gauss.integrate(polynomial, 0, 1, 0, 2 * np.pi, steps=(0.02, np.pi / 8),
+                                                   roots_count=16, batch_size=(16, 4)))
+        self.assertEqual(max(max_in_flight), 3)
+        self.assertEqual(len(stats.batches), 16)
+
+        # synchronous functions are integrated in the event loop as well
+        self.assertTrue(np.allclose(run(gauss.integrate_async(polynomial, 0, 1, 0, 2, coords_type="polar",
+                                                              steps=(0.5, 0.5), roots_count=4)),
+                                    gauss.integrate(polynomial, 0, 1, 0, 2, coords_type="polar", steps=(0.5, 0.5),
+                                                    roots_count=4)))
+
+        async def failing(x):
+            raise RuntimeError("server is unavailable")
+
+        with self.assertRaises(RuntimeError):
+            run(gauss.integrate_async(failing, 0, 1, steps=(0.1,)))
+        with self.assertRaises(ValueError):
+            run(gauss.integrate_async(remote_polynomial, 0, 1, concurrency=0))
+
     def test_circle_integration(self):
         def f(x):
             return np.power(x[0], 2) + 2 * x[1] + 5
@@ -49,3 +229,80 @@ class GaussIntegrationTest(unittest.TestCase):
         self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, 0, np.pi, steps=(0.1, np.pi/10), coords_type="polar"),
                                     [9.58001]))
 
+    def test_adaptive_integration(self):
+        def f(x):
+            return 1. / (1e-4 + np.power(x[0] - 0.3, 2))
+
+        true_value = (np.arctan(70.) + np.arctan(30.)) * 100.
+        result = gauss.integrate_adaptive(f, 0, 1, atol=1e-8, rtol=1e-10)
+        self.assertTrue(np.allclose(result.integral, true_value, atol=1e-8, rtol=1e-10))
+        self.assertTrue(result.error < 1e-6)
+        self.assertTrue(result.evaluations < 2000)
+
+        def g(x):
+            return np.exp(-(np.power(x[0] - 0.5, 2) + np.power(x[1] - 0.4, 2)) / 0.005)
+
+        grid = UniformGrid((0, 1, 0, 1), (0.5, 0.5))
+        result = gauss.integrate_adaptive(g, ndgrid=grid, rtol=1e-8)
+        self.assertTrue(np.allclose(result.integral, 0.005 * np.pi, atol=1e-10, rtol=1e-8))
+
+        # evaluations limit stops refinement
+        result = gauss.integrate_adaptive(f, 0, 1, atol=1e-12, rtol=0., max_evaluations=100)
+        self.assertTrue(result.evaluations <= 100)
+        with self.assertRaises(ValueError):
+            gauss.integrate_adaptive(f, 0, 1, steps=(0.01,), max_evaluations=100)
+        with self.assertRaises(ValueError):
+            gauss.integrate_adaptive(f, 0, 1, roots_count=1)
+
+        def fg(x):
+            return np.array([f(x), 2 * f(x), np.ones_like(x[0])])
+
+        result = gauss.integrate_adaptive(fg, 0, 1, atol=1e-8, rtol=1e-10)
+        self.assertEqual(result.integral.shape, (3,))
+        self.assertEqual(result.error.shape, (3,))
+        self.assertTrue(np.allclose(result.integral, [true_value, 2 * true_value, 1.], atol=1e-8, rtol=1e-10))
+
+    def test_parallel_integration(self):
+        grid = UniformGrid((0, 1, 0, 2 * np.pi), (0.02, np.pi / 8))
+        serial = gauss.integrate(polynomial, ndgrid=grid, roots_count=16, batch_size=(8, 4))
+        self.assertTrue(np.allclose(serial, [72.9887]))
+        for workers in (1, 2, 4):
+            self.assertEqual(gauss.integrate(polynomial, ndgrid=grid, roots_count=16, batch_size=(8, 4),
+                                             workers=workers), serial)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            self.assertEqual(gauss.integrate(polynomial, ndgrid=grid, roots_count=16, batch_size=(8, 4),
+                                             executor=executor), serial)
+
+        serial = gauss.integrate(polynomial, 0, 1, 0, np.pi, steps=(0.1, np.pi / 10), coords_type="polar")
+        parallel = gauss.integrate(polynomial, 0, 1, 0, np.pi, steps=(0.1, np.pi / 10), coords_type="polar",
+                                   executor="process", workers=2)
+        self.assertEqual(parallel, serial)
+
+        with self.assertRaises(ValueError):
+            gauss.integrate(polynomial, 0, 1, executor="gpu")
+
+    def test_streaming_integration(self):
+        grid = UniformGrid((0, 1, 0, 2 * np.pi), (0.02, np.pi / 8))
+        partials = list(gauss.integrate_iter(polynomial, ndgrid=grid, roots_count=16, batch_size=(16, 8)))
+        self.assertEqual(len(partials), 8)
+        self.assertEqual([p.blocks_done for p in partials], list(range(1, 9)))
+        self.assertTrue(all(p.blocks_count == 8 for p in partials))
+        self.assertTrue(np.allclose(partials[-1].integral, [72.9887]))
+        self.assertTrue(np.all(np.diff([p.integral for p in partials]) > 0))
+
+    def test_vector_valued_integration(self):
+        theta = np.arange(5.)
+
+        def f(x):
+            return np.power(np.expand_dims(x[0], 0), np.reshape(theta, (-1,) + (1,) * (x.ndim - 1)))
+
+        self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, steps=(0.1,), roots_count=4), 1. / (theta + 1.)))
+        self.assertTrue(np.allclose(gauss.integrate(f, 0, 1, 0, 2, steps=(0.5, 0.5), roots_count=4),
+                                    2. / (theta + 1.)))
+
+        funcs = [polynomial, lambda x: x[0] * x[1], lambda x: 2.]
+        self.assertTrue(np.allclose(gauss.integrate_many(funcs, 0, 1, 0, 2 * np.pi, steps=(0.02, np.pi / 8)),
+                                    [72.9887, np.pi ** 2, 4 * np.pi]))
+        self.assertTrue(np.allclose(gauss.integrate_many(funcs, 0, 1, 0, 2 * np.pi, coords_type="polar",
+                                                         steps=(0.1, np.pi / 5)), [16.49336, 0., 2 * np.pi]))
@@ -0,0 +1,57 @@
+import itertools
+import unittest
+from math import erf, pi, sqrt
+
+import numpy as np
+
+from numerical.integration import qmc
+
+
+class QMCIntegrationTest(unittest.TestCase):
+
+    def test_scrambled_halton(self):
+        sequence = qmc.ScrambledHalton(3, replicates=2, seed=0)
+        points = sequence.points(0, 1024)
+        self.assertEqual(points.shape, (3, 2, 1024))
+        self.assertTrue(np.all(points >= 0.) and np.all(points < 1.))
+        self.assertTrue(np.allclose(points.mean(axis=-1), 0.5, atol=1e-2))
+        # batches continue the same sequence
+        self.assertTrue(np.array_equal(sequence.points(1000, 24), points[..., 1000:]))
+        # the same seed gives the same scrambling
+        self.assertTrue(np.array_equal(qmc.ScrambledHalton(3, 2, seed=0).points(0, 1024), points))
+
+    def test_high_dimensional_integration(self):
+        def f(x):
+            return np.exp(-np.sum(np.power(x, 2), axis=0))
+
+        true_value = np.power(sqrt(pi) / 2 * erf(1.), 10)
+        result = qmc.integrate(f, *(10 * (0, 1)), rtol=1e-4, seed=1)
+        self.assertTrue(result.error <= 1e-4 * abs(result.integral))
+        self.assertTrue(np.allclose(result.integral, true_value, atol=0., rtol=1e-3))
+
+    def test_streaming_estimates(self):
+        def f(x):
+            return (x[0] + x[1] < 1.).astype(np.float64)
+
+        estimates = list(itertools.islice(qmc.integrate_iter(f, 0, 1, 0, 1, batch_size=1024, seed=2), 16))
+        self.assertEqual([e.evaluations for e in estimates], [8 * 1024 * (i + 1) for i in range(16)])
+        self.assertTrue(estimates[-1].error < estimates[0].error)
+        self.assertTrue(np.allclose(estimates[-1].integral, 0.5, atol=5 * estimates[-1].error))
+
+        result = qmc.integrate(f, 0, 1, 0, 1, max_evaluations=2 ** 14, batch_size=1024, seed=2)
+        self.assertEqual(result.evaluations, 2 ** 14)
+        # the first batch is reduced to fit the budget
+        result = qmc.integrate(f, 0, 1, 0, 1, atol=0., rtol=0., max_evaluations=1000, seed=2)
+        self.assertEqual(result.evaluations, 1000)
+
+        with self.assertRaises(ValueError):
+            qmc.integrate(f, 0, 1, 0, 1, replicates=1)
+        with self.assertRaises(ValueError):
+            qmc.integrate(f, 0, 1, 0, 1, max_evaluations=4)
+
+    def test_polar_integration(self):
+        def f(x):
+            return np.power(x[0], 2) + 2 * x[1] + 5
+
+        result = qmc.integrate(f, 0, 1, 0, 2 * np.pi, coords_type="polar", rtol=1e-5, seed=3)
+        self.assertTrue(np.allclose(result.integral, [16.49336], atol=0., rtol=1e-4))
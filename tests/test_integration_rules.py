@@ -0,0 +1,29 @@
+import unittest
+import numpy as np
+from numpy.polynomial.legendre import leggauss
+
+from numerical.integration import rules
+
+
+class LegendreRulesTest(unittest.TestCase):
+
+    def setUp(self):
+        rules.cache_clear()
+
+    def test_leggauss_rule(self):
+        roots, weights = rules.leggauss_rule(8)
+        true_roots, true_weights = leggauss(8)
+        self.assertTrue(np.allclose(roots, true_roots))
+        self.assertTrue(np.allclose(weights, true_weights))
+        self.assertFalse(weights.flags.writeable)
+
+        roots32, _ = rules.leggauss_rule(8, np.float32)
+        self.assertEqual(roots32.dtype, np.float32)
+
+    def test_cache_statistics(self):
+        rules.warm_cache(roots_counts=(16,))
+        rules.leggauss_rule(16)
+        info = rules.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+        self.assertIs(rules.leggauss_rule(16)[1], rules.leggauss_rule(16)[1])
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from numerical import interpolate
+from numerical.area.grid import UniformGrid, RectilinearGrid
+from numerical.integration import gauss, sampled
+
+
+def fun2d(x):
+    return np.sin(3 * x[0]) * np.exp(x[1])
+
+
+FUN2D_INTEGRAL = (1. - np.cos(3.)) / 3. * (np.exp(2.) - 1.)
+
+
+class SampledIntegrationTest(unittest.TestCase):
+
+    def test_sampled_integration(self):
+        grid = UniformGrid((0, 1, 0, 2), (0.05, 0.1))
+        values = fun2d(np.array(grid.meshgrid(indexing="ij")))
+        self.assertTrue(np.allclose(sampled.integrate(values, grid), FUN2D_INTEGRAL, rtol=1e-2))
+        self.assertTrue(np.allclose(sampled.integrate(values, grid, "simpson"), FUN2D_INTEGRAL, rtol=1e-5))
+        self.assertTrue(np.allclose(sampled.integrate(values, grid, "cubic"), FUN2D_INTEGRAL, rtol=1e-4))
+
+        # quadratic polynomials are integrated exactly by Simpson rule on any pairs of cells
+        grid = RectilinearGrid([0., 0.1, 0.5, 0.6, 1.], [0., 1., 1.5])
+        x, y = grid.meshgrid(indexing="ij")
+        self.assertTrue(np.allclose(sampled.integrate(np.power(x, 2) * y, grid, "simpson"), 1. / 3. * 1.125))
+        with self.assertRaises(ValueError):
+            sampled.integrate(np.ones((5, 4)), RectilinearGrid(np.arange(5.), np.arange(4.)), "simpson")
+        with self.assertRaises(ValueError):
+            sampled.integrate(np.ones((5, 4)), grid)
+        for method in ("midpoint", 0):
+            with self.assertRaisesRegex(ValueError, "'trapezoid'.*'simpson'"):
+                sampled.integrate(np.ones((5, 3)), grid, method)
+
+    def test_spline_interpolant_integration(self):
+        for grid in (UniformGrid((0, 1, 0, 2), (0.1, 0.25)),
+                     RectilinearGrid(np.power(np.linspace(0, 1, 11), 2), np.linspace(0, 2, 9))):
+            values = fun2d(np.array(grid.meshgrid(indexing="ij")))
+            for kind in ("linear", "cubic", "schoenberg", 2):
+                # integral of interpolated function is exact up to rounding
+                interpolant_integral = gauss.integrate(interpolate(values, grid, kind=kind), ndgrid=grid,
+                                                       roots_count=8)
+                self.assertTrue(np.allclose(sampled.integrate(values, grid, kind), interpolant_integral,
+                                            rtol=1e-12))
+
+    def test_sampled_integration_batches(self):
+        grid = UniformGrid((0, 1, 0, 2), (0.05, 0.1))
+        values = fun2d(np.array(grid.meshgrid(indexing="ij")))
+        vector_values = np.array([values, 2 * values])
+        integral = sampled.integrate(values, grid, "cubic")
+        self.assertTrue(np.allclose(sampled.integrate(vector_values, grid, "cubic", batch_size=3),
+                                    [integral, 2 * integral]))
+        self.assertEqual(sampled.integrate(values, grid, dtype=np.float32).dtype, np.float32)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "values.npy")
+            np.save(path, values)
+            self.assertTrue(np.allclose(sampled.integrate(path, grid, "cubic", batch_size=4), integral))
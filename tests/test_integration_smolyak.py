@@ -0,0 +1,40 @@
+import unittest
+from math import erf, pi, sqrt
+
+import numpy as np
+
+from numerical.integration import smolyak
+
+
+class SmolyakIntegrationTest(unittest.TestCase):
+
+    def test_sparse_grid(self):
+        for dim in (1, 2, 5, 8):
+            points, weights = smolyak.sparse_grid(5, dim)
+            self.assertEqual(points.shape, (len(weights), dim))
+            self.assertTrue(np.allclose(weights.sum(), 2 ** dim))
+        # points count grows polynomially with dimension
+        self.assertTrue(len(smolyak.sparse_grid(4, 8)[1]) < 4 ** 8 / 10)
+        with self.assertRaises(ValueError):
+            smolyak.sparse_grid(0, 2)
+
+    def test_polynomial_integration(self):
+        def f(x):
+            return np.power(x[0], 3) * np.power(x[1], 2) * np.power(x[2], 4) + np.power(x[3], 9)
+
+        self.assertTrue(np.allclose(smolyak.integrate(f, 0, 1, 0, 2, 0, 1, -1, 2, level=5), [205.]))
+
+    def test_high_dimensional_integration(self):
+        def f(x):
+            return np.exp(-np.sum(np.power(x, 2), axis=0))
+
+        true_value = np.power(sqrt(pi) / 2 * erf(1.), 6)
+        self.assertTrue(np.allclose(smolyak.integrate(f, *(6 * (0, 1))), true_value, atol=1e-7, rtol=1e-7))
+        self.assertTrue(np.allclose(smolyak.integrate(f, *(6 * (0, 1)), batch_size=1000), true_value,
+                                    atol=1e-7, rtol=1e-7))
+
+    def test_polar_integration(self):
+        def f(x):
+            return np.power(x[0], 2) + 2 * x[1] + 5
+
+        self.assertTrue(np.allclose(smolyak.integrate(f, 0, 1, 0, 2 * np.pi, level=10, coords_type="polar"), [16.49336]))
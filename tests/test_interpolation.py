@@ -1,6 +1,9 @@
+import os
+import tempfile
 import unittest
 import numpy as np
-from numerical import interpolate
+from numerical import interpolate, interpolation_matrix, Stats
+from numerical.area.grid import UniformGrid, RectilinearGrid
 
 
 class InterpolationTest(unittest.TestCase):
@@ -61,3 +64,192 @@ class InterpolationTest(unittest.TestCase):
 
         x = np.random.rand(3, 5, 5, 5)
         self.assertTrue(np.allclose(spline_fun(x), fun3d(x), atol=1e-1, rtol=1e-1))
+
+    def test_local_interpolation(self):
+        def fun3d(x):
+            return (2 * x[0] - 1) * (x[1] + 3) * (0.5 - x[2])
+
+        grid1 = np.linspace(0, 1, 11)
+        grid2 = np.linspace(-1, 1, 21)
+        grid3 = np.linspace(0, 2, 5)
+        meshgrid = np.meshgrid(grid1, grid2, grid3, indexing='ij')
+        values = fun3d(meshgrid)
+
+        # trilinear function is reproduced exactly by linear splines
+        x = np.random.rand(3, 7, 3) * np.array([1, 2, 2]).reshape(3, 1, 1) - np.array([0, 1, 0]).reshape(3, 1, 1)
+        self.assertTrue(np.allclose(interpolate(values, meshgrid)(x), fun3d(x)))
+        self.assertTrue(np.allclose(interpolate(values, meshgrid, 4)(x), fun3d(x)))
+
+        # outside the grid only boundary basis functions contribute
+        values = np.ones(11)
+        spline_fun = interpolate(values, [grid1])
+        self.assertTrue(np.allclose(spline_fun(np.array([[-0.05, 1.025, 1.1, -3.]])), [0.5, 0.75, 0., 0.]))
+
+    def test_interpolation_derivatives(self):
+        def fun2d(x):
+            return np.power(x[0], 2) * x[1] + np.sin(x[1])
+
+        meshgrid = np.meshgrid(np.linspace(0, 1, 201), np.linspace(0, 2, 401), indexing='ij')
+        spline_fun = interpolate(fun2d(meshgrid), meshgrid, 3)
+
+        x = np.random.rand(2, 4, 2)
+        values, gradient, hessian = spline_fun.hessian(x)
+        self.assertEqual(gradient.shape, (2, 4, 2))
+        self.assertEqual(hessian.shape, (2, 2, 4, 2))
+        self.assertTrue(np.allclose(values, fun2d(x), atol=1e-4))
+        self.assertTrue(np.allclose(gradient, [2 * x[0] * x[1], np.power(x[0], 2) + np.cos(x[1])], atol=1e-2))
+        self.assertTrue(np.allclose(hessian[0, 1], 2 * x[0], atol=1e-2))
+        self.assertTrue(np.allclose(hessian[1, 0], hessian[0, 1]))
+
+        values, gradient = spline_fun.gradient(x)
+        self.assertTrue(np.allclose(gradient[1], spline_fun.deriv(x, (0, 1))))
+        with self.assertRaises(ValueError):
+            spline_fun.deriv(x, 1)
+
+        # linear function has exact derivative
+        spline_fun = interpolate(np.linspace(0, 3, 11), [np.linspace(0, 1, 11)])
+        self.assertTrue(np.allclose(spline_fun.deriv(np.random.rand(1, 5), 1), 3.))
+
+    def test_higher_order_interpolation(self):
+        def fun2d(x):
+            return np.sin(3 * x[0]) * np.exp(x[1])
+
+        meshgrid = np.meshgrid(np.linspace(0, 1, 21), np.linspace(0, 1, 11), indexing='ij')
+        values = fun2d(meshgrid)
+        x = np.random.RandomState(0).rand(2, 200)
+        for kind in ("cubic", "schoenberg", 2, 7):
+            spline_fun = interpolate(values, meshgrid, kind=kind)
+            # interpolation conditions hold in grid nodes
+            self.assertTrue(np.allclose(spline_fun(np.array(meshgrid)), values))
+
+        # spline of degree d converges with order d + 1 in max-norm up to grid boundary
+        points = np.linspace(0, 1, 2001).reshape(1, -1)
+        for kind, order in (("linear", 2), (2, 3), ("cubic", 4), ("schoenberg", 6)):
+            errors = []
+            for count in (11, 21, 41, 81):
+                grid = [np.linspace(0, 1, count)]
+                spline_fun = interpolate(np.sin(3 * grid[0] + 0.4), grid, kind=kind)
+                errors.append(np.abs(spline_fun(points) - np.sin(3 * points[0] + 0.4)).max())
+            self.assertTrue(np.all(np.log2(np.array(errors[:-1]) / errors[1:]) > order - 0.2))
+
+        spline_fun = interpolate(values, meshgrid, kind="schoenberg")
+        _, gradient = spline_fun.gradient(x)
+        self.assertTrue(np.allclose(gradient[0], 3 * np.cos(3 * x[0]) * np.exp(x[1]), atol=5e-2))
+
+        # linear functions are reproduced exactly up to the boundary
+        def fun1d(x):
+            return 2 * x[0] - 1
+
+        meshgrid = [np.linspace(0, 1, 6)]
+        spline_fun = interpolate(fun1d(meshgrid), meshgrid, kind="cubic")
+        x = np.random.rand(1, 20)
+        self.assertTrue(np.allclose(spline_fun(x), fun1d(x)))
+
+        with self.assertRaises(ValueError):
+            interpolate(values, meshgrid, kind="quadratic")
+        with self.assertRaises(ValueError):
+            interpolate(np.ones(2), [np.linspace(0, 1, 2)], kind="schoenberg")
+
+    def test_grid_interpolation(self):
+        def fun2d(x):
+            return np.exp(-20 * x[0]) + x[0] * x[1]
+
+        # nodes are clustered near the boundary layer
+        gd = RectilinearGrid(np.power(np.linspace(0, 1, 41), 2), np.linspace(-1, 1, 5))
+        values = fun2d(gd.meshgrid(indexing="ij"))
+        x = np.random.RandomState(0).rand(2, 100) * np.array([[0.2], [2.]]) - np.array([[0.], [1.]])
+        spline_fun = interpolate(values, gd)
+        self.assertTrue(np.allclose(spline_fun(np.array(gd.meshgrid(indexing="ij"))), values))
+        self.assertTrue(np.allclose(spline_fun(x), fun2d(x), atol=1e-2))
+
+        # bilinear function and its derivatives are exact on any grid
+        values = gd.meshgrid(indexing="ij")[0] * gd.meshgrid(indexing="ij")[1]
+        _, gradient = interpolate(values, gd).gradient(x)
+        self.assertTrue(np.allclose(gradient, x[::-1]))
+
+        gd = UniformGrid((0, 1, -1, 1), (0.05, 0.5))
+        meshgrid = gd.meshgrid(indexing="ij")
+        self.assertTrue(np.allclose(interpolate(fun2d(meshgrid), gd, kind="cubic")(x),
+                                    interpolate(fun2d(meshgrid), meshgrid, kind="cubic")(x)))
+
+    def test_memory_mapped_interpolation(self):
+        def fun2d(x):
+            return np.sin(3 * x[0]) * np.exp(x[1])
+
+        gd = UniformGrid((0, 1, -1, 1), counts=(31, 17))
+        self.assertEqual(gd.shape, (31, 17))
+        values = fun2d(gd.meshgrid(indexing="ij")).astype(np.float32)
+        x = np.random.RandomState(0).rand(2, 300) * np.array([[1.], [2.]]) - np.array([[0.], [1.]])
+        expected = interpolate(values, gd)(x)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "values.npy")
+            np.save(path, values)
+            spline_fun = interpolate(path, gd, batch_size=64)
+            self.assertTrue(np.allclose(spline_fun(x), expected))
+
+            # Fortran ordered file is read without copying as well
+            np.save(path, np.asfortranarray(values))
+            spline_fun = interpolate(np.load(path, mmap_mode="r"), gd, batch_size=64)
+            chunks = list(spline_fun.evaluate(np.array_split(x, 4, axis=1)))
+            self.assertEqual(len(chunks), 4)
+            self.assertTrue(np.allclose(np.concatenate(chunks), expected))
+
+            values = np.load(path, mmap_mode="r")
+            self.assertTrue(np.allclose(interpolate(values, gd, kind="cubic")(x),
+                                        interpolate(np.array(values), gd, kind="cubic")(x)))
+            del spline_fun, values
+
+    def test_interpolation_matrix(self):
+        def fun2d(x, p):
+            return np.sin(p * x[0]) * np.exp(x[1])
+
+        gd = UniformGrid((0, 1, 0, 1), counts=(21, 11))
+        meshgrid = gd.meshgrid(indexing="ij")
+        x = np.random.RandomState(0).rand(2, 40, 5) * 1.2 - 0.1
+        stack = np.array([fun2d(meshgrid, p) for p in (1., 2., 3.)])
+
+        for kind in ("linear", "cubic"):
+            matrix = interpolation_matrix(gd, x, kind=kind, batch_size=32)
+            self.assertEqual(matrix.shape[0], 200)
+            result = matrix.apply(stack)
+            self.assertEqual(result.shape, (3, 40, 5))
+            for values, field in zip(stack, result):
+                self.assertTrue(np.allclose(field, interpolate(values, gd, kind=kind)(x)))
+            self.assertTrue(np.allclose(matrix @ stack[1], result[1]))
+
+        matrix = interpolation_matrix(meshgrid, x, order=(1, 0))
+        self.assertTrue(np.allclose(matrix.apply(stack[0]), interpolate(stack[0], meshgrid).deriv(x, (1, 0))))
+        # linear basis has at most 4 nonzero nodes in 2 dimensions
+        self.assertTrue(matrix.nnz <= 4 * 200)
+        self.assertEqual(matrix.matrix.shape, matrix.shape)
+        self.assertEqual(interpolation_matrix(gd, x, dtype=np.float32).apply(stack).dtype, np.float32)
+        with self.assertRaises(ValueError):
+            matrix.apply(np.ones((3, 4)))
+
+    def test_interpolation_stats(self):
+        stats = Stats()
+        meshgrid = [np.linspace(0, 1, 11)]
+        spline_fun = interpolate(np.ones(11), meshgrid, batch_size=30, stats=stats)
+        spline_fun(np.random.rand(1, 100))
+        self.assertEqual([batch.points for batch in stats.batches], [30, 30, 30, 10])
+        self.assertEqual(set(stats.summary()["times"]), {"weights", "gather", "reduction"})
+
+    def test_auto_batch_size(self):
+        stats = Stats()
+        meshgrid = np.meshgrid(np.linspace(0, 1, 11), np.linspace(0, 1, 11), indexing="ij")
+        values = np.sin(meshgrid[0]) * meshgrid[1]
+        # cubic basis takes 16 nodes of 24 bytes for each point in 2 dimensions
+        spline_fun = interpolate(values, meshgrid, kind="cubic", memory_limit=384 * 50, stats=stats)
+        self.assertEqual(spline_fun.batch_size, 50)
+        x = np.random.rand(2, 120)
+        self.assertTrue(np.allclose(spline_fun.hessian(x)[2],
+                                    interpolate(values, meshgrid, kind="cubic").hessian(x)[2]))
+        self.assertEqual([batch.points for batch in stats.batches], [50, 50, 20])
+        self.assertEqual([batch.batch_size for batch in stats.batches], [50, 50, 50])
+        self.assertEqual(interpolate(values, meshgrid, batch_size="auto").batch_size, 2 ** 26 // (4 * 24))
+        # default batch size is bounded by the default memory limit
+        self.assertEqual(interpolate(values, meshgrid, kind="schoenberg").batch_size, 2 ** 26 // (36 * 24))
+        self.assertEqual(interpolation_matrix(meshgrid, x, kind="cubic").batch_size, 2 ** 26 // (16 * 24))
+        with self.assertRaises(ValueError):
+            interpolate(values, meshgrid, batch_size="all")
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+import unittest
+import numpy as np
+
+import numerical
+from numerical import interpolate, splines
+from numerical.area.grid import UniformGrid
+from numerical.integration import gauss, smolyak, qmc, rules, sampled
+
+
+class PrecisionTest(unittest.TestCase):
+
+    def test_default_dtype(self):
+        self.assertEqual(numerical.get_dtype(), np.float64)
+        with numerical.precision(np.float32):
+            self.assertEqual(numerical.get_dtype(), np.float32)
+            self.assertEqual(splines.linear(np.arange(3)).dtype, np.float32)
+            self.assertEqual(rules.leggauss_rule(4)[0].dtype, np.float32)
+            self.assertEqual(gauss.integrate(lambda x: x[0], 0, 1).dtype, np.float32)
+        self.assertEqual(numerical.get_dtype(), np.float64)
+        self.assertEqual(splines.linear(np.arange(3)).dtype, np.float64)
+
+        with self.assertRaises(ValueError):
+            numerical.set_dtype(np.int32)
+
+    def test_thread_precision(self):
+        entered, checked = threading.Event(), threading.Event()
+        dtypes = []
+
+        def float32_integration():
+            with numerical.precision(np.float32):
+                entered.set()
+                checked.wait(10)
+                dtypes.append(gauss.integrate(lambda x: x[0], 0, 1).dtype)
+
+        thread = threading.Thread(target=float32_integration)
+        thread.start()
+        entered.wait(10)
+        # precision block of another thread doesn't change default dtype of this one
+        self.assertEqual(numerical.get_dtype(), np.float64)
+        self.assertEqual(gauss.integrate(lambda x: x[0], 0, 1, executor="thread", workers=2).dtype, np.float64)
+        checked.set()
+        thread.join()
+        self.assertEqual(dtypes, [np.float32])
+
+        def f(x):
+            self.assertEqual(numerical.get_dtype(), np.float32)
+            return x[0]
+
+        # workers of a pool evaluate blocks with dtype of the calling thread
+        with numerical.precision(np.float32):
+            integral = gauss.integrate(f, 0, 1, steps=(0.1,), batch_size=(2,), executor="thread", workers=2)
+        self.assertEqual(integral.dtype, np.float32)
+
+    def test_scalar_integrals(self):
+        def f(x):
+            return x[0] * x[1]
+
+        loop = asyncio.new_event_loop()
+        try:
+            async_integral = loop.run_until_complete(gauss.integrate_async(f, 0, 1, 0, 1))
+        finally:
+            loop.close()
+        integrals = [gauss.integrate(f, 0, 1, 0, 1), async_integral, smolyak.integrate(f, 0, 1, 0, 1, level=3),
+                     qmc.integrate(f, 0, 1, 0, 1, max_evaluations=2 ** 10, seed=0).integral,
+                     sampled.integrate(np.ones((3, 3)), UniformGrid((0, 1, 0, 1), counts=(3, 3)))]
+        # integrals of scalar functions are numpy scalars, which are floats
+        for integral in integrals:
+            self.assertIsInstance(integral, float)
+        json.dumps({"integral": integrals[0]})
+        self.assertIsInstance(gauss.integrate(f, 0, 1, 0, 1, dtype=np.float32), np.float32)
+
+    def test_float32_integration(self):
+        def f(x):
+            self.assertEqual(x.dtype, np.float32)
+            return np.power(x[0], 2) + 2 * x[1] + 5
+
+        integral = gauss.integrate(f, 0, 1, 0, 2 * np.pi, steps=(0.02, np.pi / 8), roots_count=4, dtype=np.float32)
+        self.assertEqual(integral.dtype, np.float32)
+        self.assertTrue(np.allclose(integral, [72.9887], rtol=1e-6))
+
+        result = gauss.integrate_adaptive(f, 0, 1, 0, 2, roots_count=4, dtype=np.float32)
+        self.assertEqual(result.integral.dtype, np.float32)
+        self.assertTrue(np.allclose(result.integral, 1. / 3. * 2 + 4 + 10, rtol=1e-6))
+
+        self.assertTrue(np.allclose(smolyak.integrate(f, 0, 1, 0, 2, level=3, dtype=np.float32), 14.6666667))
+        estimate = qmc.integrate(f, 0, 1, 0, 2, max_evaluations=2 ** 14, seed=0, dtype=np.float32)
+        self.assertTrue(np.allclose(estimate.integral, 14.6666667, rtol=1e-3))
+
+    def test_float32_interpolation(self):
+        def fun2d(x):
+            return np.sin(3 * x[0]) * np.exp(x[1])
+
+        meshgrid = np.meshgrid(np.linspace(0, 1, 21), np.linspace(0, 1, 11), indexing='ij')
+        x = np.random.RandomState(0).rand(2, 50)
+        for kind in ("linear", "cubic"):
+            spline_fun = interpolate(fun2d(meshgrid), meshgrid, kind=kind, dtype=np.float32)
+            values, gradient = spline_fun.gradient(x)
+            self.assertEqual(values.dtype, np.float32)
+            self.assertEqual(gradient.dtype, np.float32)
+            self.assertTrue(np.allclose(values, interpolate(fun2d(meshgrid), meshgrid, kind=kind)(x), atol=1e-5))
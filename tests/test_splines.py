@@ -1,6 +1,7 @@
 import unittest
 import numpy as np
-from numerical import splines
+from numerical import splines, derivative
+from numerical.splines.piecewise import PiecewisePolynomial
 
 
 class SplinesTest(unittest.TestCase):
@@ -20,3 +21,66 @@ class SplinesTest(unittest.TestCase):
                                     [0., -0.999997, 0., -1., 0.044515, 0.47195722, 0., 0.]))
         self.assertTrue(np.allclose(splines.schoenberg.deriv(var, order=3),
                                     [0., 0.005995, 0., 0., -0.207368, 0.14529, 0., 0.]))
+
+    def test_output_buffer(self):
+        var = np.array([[0.0, 0.256], [-0.756, 1.5]])
+        out = np.empty_like(var)
+        self.assertIs(splines.linear(var, out=out), out)
+        self.assertTrue(np.allclose(out, [[1.0, 0.744], [0.244, 0.0]]))
+
+        out = np.empty(3)
+        splines.schoenberg.deriv(np.array([0.001, 2.356, np.nan]), order=2, out=out)
+        self.assertTrue(np.allclose(out, [-0.999997, 0.044515, 0.]))
+
+        self.assertEqual(splines.schoenberg(np.array([0.5, 1.5], dtype=np.float32)).dtype, np.float32)
+
+    def test_piecewise_polynomial(self):
+        # x^2 on [0, 1) and 2 - x on [1, 2)
+        f = PiecewisePolynomial(0., [[0., 0., 1.], [2., -1., 0.]])
+        self.assertEqual(f.support, (0., 2.))
+        self.assertEqual(f.degree, 2)
+        self.assertTrue(np.allclose(f(np.array([-0.5, 0.5, 1., 1.5, 2., np.inf])), [0., 0.25, 1., 0.5, 0., 0.]))
+        self.assertTrue(np.allclose(f(0.5), 0.25))
+        self.assertTrue(np.allclose(f.integral(np.array([-1., 0.5, 0.]), np.array([3., 1.5, 1.])),
+                                    [1. / 3. + 0.5, 7. / 24. + 0.375, 1. / 3.]))
+        self.assertTrue(np.allclose(splines.bspline(4).kernel.integral(-5., 5.), 1.))
+
+    def test_spline_derivatives(self):
+        var = np.array([-1.5, -0.5, 0.0, 0.5, 1.0])
+        self.assertTrue(np.allclose(splines.linear.deriv(var, order=1), [0., 1., -1., -1., 0.]))
+        self.assertTrue(np.allclose(splines.linear.deriv(var, order=(2,)), 0.))
+
+        var = np.array([0.5, 1.5, 2.5])
+        self.assertTrue(np.allclose(splines.schoenberg.deriv(var, order=4), [6. - 10. * 0.5, -9. + 5. * 1.5, 3. - 2.5]))
+        self.assertTrue(np.allclose(splines.schoenberg.deriv(var, order=0), splines.schoenberg(var)))
+        self.assertTrue(np.allclose(splines.schoenberg.deriv(var, order=6), 0.))
+        with self.assertRaises(ValueError):
+            splines.schoenberg.deriv(var, order=(1, 1))
+
+        f = PiecewisePolynomial(0., [[0., 0., 1.], [2., -1., 0.]])
+        self.assertIs(f.derivative(1), f.derivative(1))
+        self.assertTrue(np.allclose(f.derivative(1)(np.array([0.5, 1.5])), [1., -1.]))
+
+        with self.assertRaises(NotImplementedError):
+            derivative.setup(ftype="numerical")(np.sin)
+
+    def test_bspline(self):
+        var = np.linspace(-4., 4., 81)
+        self.assertTrue(np.allclose(splines.bspline(1)(var), splines.linear(var)))
+        self.assertTrue(np.allclose(splines.bspline(5)(var[var >= 0]), splines.schoenberg(var[var >= 0])))
+        self.assertTrue(np.allclose(splines.bspline(5)(var), splines.bspline(5)(-var)))
+        self.assertTrue(np.allclose(splines.bspline(3)(np.array([0., 1., 2.])), [2 / 3., 1 / 6., 0.]))
+        # partition of unity
+        for degree in range(8):
+            self.assertTrue(np.allclose(splines.bspline(degree)(np.arange(-5, 6).reshape(-1, 1) + np.linspace(0., 1., 9)).sum(0), 1.))
+        # coefficients of local variable of each piece don't lose precision for high degrees
+        for degree in (15, 19, 25):
+            var = np.arange(-degree - 1, degree + 2).reshape(-1, 1) + np.linspace(0., 1., 101)
+            values = splines.bspline(degree)(var)
+            self.assertTrue(np.abs(values.sum(0) - 1.).max() < 1e-14)
+            self.assertTrue(values.min() > -1e-14)
+        f = PiecewisePolynomial(0., [[0., 0., 1.], [1., -1., 0.]], local=True)
+        self.assertTrue(np.allclose(f(np.array([0.5, 1.5])), [0.25, 0.5]))
+        self.assertTrue(np.allclose(f.derivative(1)(np.array([0.5, 1.5])), [1., -1.]))
+        self.assertTrue(np.allclose(f.integral(0., 2.), 1. / 3. + 0.5))
+        self.assertTrue(np.allclose(splines.bspline(3).deriv(np.array([1.]), order=1), [-0.5]))
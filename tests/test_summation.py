@@ -0,0 +1,22 @@
+import unittest
+import numpy as np
+from numerical.utils.summation import CompensatedSum
+
+
+class CompensatedSumTest(unittest.TestCase):
+
+    def test_compensated_sum(self):
+        total = CompensatedSum()
+        for value in [1., 1e100, 1., -1e100]:
+            total.add(value)
+        self.assertEqual(total.value, 2.)
+
+        total = CompensatedSum()
+        for _ in range(10 ** 4):
+            total.add(0.1)
+        self.assertEqual(total.value, 1000.)
+
+    def test_array_sum(self):
+        total = CompensatedSum()
+        total.add(np.array([1., 1e16])).add(np.array([1e16, 1.])).add(np.array([-1e16, -1e16]))
+        self.assertTrue(np.array_equal(total.value, [1., 1.]))
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+
+from numerical.area.grid import UniformGrid
+from numerical.integration import gauss
+from numerical.integration.summed_area import SummedAreaTable
+
+
+def polynomial(x):
+    return np.power(x[0], 2) + 2 * x[1] + 5
+
+
+def polynomial_integral(a, b, c, d):
+    return (b ** 3 - a ** 3) / 3. * (d - c) + (b - a) * (d ** 2 - c ** 2) + 5 * (b - a) * (d - c)
+
+
+class SummedAreaTableTest(unittest.TestCase):
+
+    def test_box_integrals(self):
+        grid = UniformGrid((0, 1, 0, 2), (0.1, 0.25))
+        table = SummedAreaTable(gauss.integrate_cells(polynomial, ndgrid=grid, roots_count=4), grid)
+        self.assertEqual(table.shape, (11, 9))
+        self.assertTrue(np.allclose(table.total, polynomial_integral(0, 1, 0, 2)))
+        self.assertTrue(np.allclose(table.integral(0.2, 0.7, 0.5, 1.25), polynomial_integral(0.2, 0.7, 0.5, 1.25)))
+        self.assertTrue(np.allclose(table.box([2, 2], [7, 5]), polynomial_integral(0.2, 0.7, 0.5, 1.25)))
+        self.assertTrue(np.allclose(table.box([3, 4], [3, 8]), 0.))
+
+        a, b = np.array([0., 0.3, 0.5]), np.array([1., 0.4, 0.9])
+        c, d = np.array([0., 1., 0.25]), np.array([2., 1.5, 0.5])
+        self.assertTrue(np.allclose(table.integral(a, b, c, d), polynomial_integral(a, b, c, d)))
+
+        with self.assertRaises(ValueError):
+            table.integral(0.15, 0.7, 0.5, 1.25)
+        with self.assertRaises(ValueError):
+            table.box([2, 2], [11, 5])
+        with self.assertRaises(ValueError):
+            table.box([5, 2], [2, 5])
+
+    def test_cumulative_integrals(self):
+        grid = UniformGrid((0, 1, 0, 2), (0.1, 0.25))
+        table = SummedAreaTable(gauss.integrate_cells(polynomial, ndgrid=grid, roots_count=4), grid)
+        x, y = grid[0].nodes, grid[1].nodes
+        self.assertTrue(np.allclose(table.cumulative(0), polynomial_integral(0, x, 0, 2)))
+        self.assertTrue(np.allclose(table.cumulative(1), polynomial_integral(0, 1, 0, y)))
+
+    def test_vector_valued_cells(self):
+        cells = np.ones((3, 4, 5)) * np.reshape([1., 2., 3.], (-1, 1, 1))
+        table = SummedAreaTable(cells, UniformGrid((0, 4, 0, 5), (1, 1)))
+        self.assertEqual(table.values_shape, (3,))
+        self.assertTrue(np.allclose(table.box([1, 1], [3, 4]), [6., 12., 18.]))
+        self.assertTrue(np.allclose(table.box([[0, 1], [0, 1]], [[4, 3], [5, 4]]), [[20., 6.], [40., 12.], [60., 18.]]))
+        self.assertTrue(np.allclose(SummedAreaTable(cells[0]).box([1, 0], [2, 5]), 5.))
+        with self.assertRaises(ValueError):
+            SummedAreaTable(cells, UniformGrid((0, 4, 0, 4), (1, 1)))